@@ -0,0 +1,81 @@
+"""
+Asset preprocessing
+
+    python -m app.assets build
+
+Decodes every image under assets/ and writes the normalized asset store
+(ASSET_STORE_DIR): one memory-mapped data file with raw RGBA pixels at each
+image's original size and at the sizes dynamic image layers draw it at, and
+the font files, plus a manifest of dimensions, offsets and content hashes.
+The renderer maps the store and falls back to the original files for anything
+missing or stale, so rebuild after changing assets.
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List, Tuple
+
+from app.core.layers.image import DYNAMIC_BOX, ICON_DYNAMIC_BOX, is_icon
+from app.core.utils.asset_store import DATA_FILE, build_store
+from app.core.utils.fonts import FONT_EXTENSIONS
+from app.core.utils.paths import resolve_asset_path
+from app.settings import settings
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def _walk(asset_dir: str, extensions) -> List[str]:
+    """Files under asset_dir with one of the extensions, relative to the project root (skips the store)"""
+    store_dir = os.path.normpath(resolve_asset_path(settings.ASSET_STORE_DIR))
+    found = []
+    for root, dirs, files in os.walk(resolve_asset_path(asset_dir)):
+        dirs[:] = [d for d in dirs if os.path.normpath(os.path.join(root, d)) != store_dir]
+        found += [os.path.relpath(os.path.join(root, name), resolve_asset_path(""))
+                  for name in files if name.lower().endswith(extensions)]
+    return sorted(found)
+
+
+def asset_sources(asset_dir: str = "assets") -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Images under asset_dir with the boxes to pre-scale them into
+
+    Returns:
+        Path relative to the project root -> boxes
+    """
+    icon_boxes = [ICON_DYNAMIC_BOX] + [(size, size) for size in settings.ICON_ATLAS_SIZES]
+    return {rel_path: icon_boxes if is_icon(rel_path) else [DYNAMIC_BOX]
+            for rel_path in _walk(asset_dir, IMAGE_EXTENSIONS)}
+
+
+def build(asset_dir: str) -> int:
+    store_dir = resolve_asset_path(settings.ASSET_STORE_DIR)
+    try:
+        manifest = build_store(store_dir, asset_sources(asset_dir), _walk(asset_dir, FONT_EXTENSIONS))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for rel_path, entry in manifest["assets"].items():
+        print(f"{rel_path}: {entry['format']} {entry['mode']} -> RGBA {', '.join(entry['variants'])}")
+    for rel_path in manifest["fonts"]:
+        print(f"{rel_path}: font")
+    total = os.path.getsize(os.path.join(store_dir, DATA_FILE))
+    print(f"Wrote {len(manifest['assets'])} images and {len(manifest['fonts'])} fonts "
+          f"({total / (1024 * 1024):.1f} MB) to {store_dir}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="write the normalized asset store")
+    build_parser.add_argument("--assets", default="assets", help="asset directory relative to the project root")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        return build(args.assets)
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
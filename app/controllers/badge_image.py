@@ -2,24 +2,197 @@
 Badge image generation controller
 """
 
-from fastapi import APIRouter, HTTPException
-from app.models.requests import BadgeRequest, TextOverlayBadgeRequest, IconBasedBadgeRequest
-from app.models.responses import BadgeResponse
-from app.services.badge_service import BadgeService
+import asyncio
+import base64
+import dataclasses
+import json
+import random
+from typing import List, Literal, Optional, Tuple, Union
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app.models.requests import (
+    BadgeRequest, TextOverlayBadgeRequest, IconBasedBadgeRequest, BatchBadgeRequest, BadgeVariantsRequest,
+    TemplateRequest, TemplateRenderRequest,
+)
+from app.models.responses import BadgeData, BadgeResponse, BadgeVariant, BadgeVariantsResponse, TemplateResponse
+from app.services.badge_service import BadgeService, RenderedBadge
+from app.services.template_service import TemplateService
 from app.services.config_generator import generate_text_overlay_config, generate_icon_based_config
 from app.core.logging_config import get_logger
+from app.core.render_executor import RenderQueueFullError, render_executor
+from app.core.timing import new_timings, timed
+from app.core.utils.cache import LRUCache
+from app.settings import settings
 
 router = APIRouter()
 logger = get_logger("badge_image_controller")
 badge_service = BadgeService()
+template_service = TemplateService()
+
+# With a seed, config generation is a pure function of the request, so the
+# rendered badge can be reused without running the generator or the Composer
+seeded_cache = LRUCache("seeded_responses", max_bytes=settings.SEEDED_CACHE_MAX_BYTES)
+
+ResponseFormat = Literal["json", "raw"]
+
+# OpenAPI description of the raw image alternative to the JSON body
+RAW_IMAGE_RESPONSE = {
+    200: {
+        "content": {"image/png": {}},
+        "description": "BadgeResponse JSON, or the raw image when requested with "
+                       "?format=raw or an Accept: image/* (or the badge's media type) "
+                       "header; other image types get 406. In raw mode the "
+                       "config is sent base64-encoded JSON in the X-Badge-Config header.",
+    }
+}
+
+
+def _seeded_key(endpoint: str, request: BaseModel) -> Optional[Tuple[str, str]]:
+    """Cache key for a seeded request, or None if the request isn't deterministic"""
+    if not settings.SEEDED_CACHE_ENABLED or getattr(request, "seed", None) is None:
+        return None
+    return endpoint, json.dumps(request.model_dump(), sort_keys=True)
+
+
+def _cached_badge(key: Optional[Tuple[str, str]]) -> Optional[RenderedBadge]:
+    if key is None:
+        return None
+    rendered = seeded_cache.get(key)
+    return dataclasses.replace(rendered, cached=True) if rendered else None
+
+
+def _store_badge(key: Optional[Tuple[str, str]], rendered: RenderedBadge):
+    if key is not None:
+        size = len(rendered.image) + len(json.dumps(rendered.config, default=str))
+        # Spans describe this request's render, not later cache hits
+        seeded_cache.put(key, dataclasses.replace(rendered, timings=None), size)
+
+
+def _wants_raw(http_request: Request, format: Optional[str], media_type: str) -> bool:
+    """
+    Raw image if ?format=raw, or if the client's preferred Accept type is
+    image/* or the rendered image's media type
+
+    Raises:
+        HTTPException: 406 if the preferred Accept type is another image type
+    """
+    if format is not None:
+        return format == "raw"
+    accept = http_request.headers.get("accept", "")
+    preferred = accept.split(",")[0].split(";")[0].strip().lower()
+    if preferred in ("image/*", media_type):
+        return True
+    if preferred.startswith("image/"):
+        raise HTTPException(status_code=406, detail=f"Badge is rendered as {media_type}, not {preferred}")
+    return False
+
+
+def _respond(http_request: Request, response: Response, format: Optional[str], rendered: RenderedBadge):
+    """Build the JSON BadgeResponse or a raw image response for a rendered badge"""
+    if not _wants_raw(http_request, format, rendered.media_type):
+        body = rendered.to_response()
+        if rendered.timings is not None:
+            response.headers["Server-Timing"] = rendered.timings.server_timing()
+        return body
+
+    config_json = json.dumps(rendered.config, separators=(",", ":"), default=str)
+    headers = {
+        "X-Badge-Config": base64.b64encode(config_json.encode("utf-8")).decode("ascii"),
+        "X-Render-Cache": "HIT" if rendered.cached else "MISS",
+    }
+    if rendered.timings is not None:
+        headers["Server-Timing"] = rendered.timings.server_timing()
+    return Response(content=memoryview(rendered.image), media_type=rendered.media_type, headers=headers)
+
+
+async def _render_custom(request: BadgeRequest) -> RenderedBadge:
+    """Render a raw layer configuration"""
+    request_dict = request.model_dump()
+    rendered = await badge_service.render_badge(request_dict, new_timings())
+
+    # Add the input configuration to the response
+    rendered.config = {
+        "canvas": request_dict.get("canvas", {}),
+        "layers": request_dict.get("layers", [])
+    }
+    return rendered
+
+
+async def _render_text(request: TextOverlayBadgeRequest) -> RenderedBadge:
+    """Generate a text overlay config and render it"""
+    cache_key = _seeded_key("text", request)
+    cached = _cached_badge(cache_key)
+    if cached:
+        logger.info(f"Text overlay badge served from seeded cache: {request.short_title}")
+        return cached
+
+    # Step 1: Generate image config
+    timings = new_timings()
+    with timed(timings, "generate"):
+        config = generate_text_overlay_config(
+            short_title=request.short_title,
+            institute=request.institute or "",
+            achievement_phrase=request.achievement_phrase,
+            colors=request.colors,
+            seed=request.seed
+        )
+
+    # Step 2: Render badge image
+    badge_request = {
+        "canvas": {"bg": "white"},
+        "layers": config["layers"]
+    }
+
+    rendered = await badge_service.render_badge(badge_request, timings)
+
+    # Step 3: Add config to response
+    rendered.config = config
+    _store_badge(cache_key, rendered)
+    return rendered
 
-@router.post("/badge/generate", response_model=BadgeResponse)
-async def generate_badge(request: BadgeRequest):
+
+async def _render_icon(request: IconBasedBadgeRequest) -> RenderedBadge:
+    """Generate an icon-based config and render it"""
+    cache_key = _seeded_key("icon", request)
+    cached = _cached_badge(cache_key)
+    if cached:
+        logger.info(f"Icon-based badge served from seeded cache with icon: {request.icon_name}")
+        return cached
+
+    # Step 1: Generate image config
+    timings = new_timings()
+    with timed(timings, "generate"):
+        config = generate_icon_based_config(
+            icon_name=request.icon_name,
+            colors=request.colors,
+            seed=request.seed
+        )
+
+    # Step 2: Render badge image
+    badge_request = {
+        "canvas": {"bg": "white"},
+        "layers": config["layers"]
+    }
+
+    rendered = await badge_service.render_badge(badge_request, timings)
+
+    # Step 3: Add config to response
+    rendered.config = config
+    _store_badge(cache_key, rendered)
+    return rendered
+
+
+@router.post("/badge/generate", response_model=BadgeResponse, responses=RAW_IMAGE_RESPONSE)
+async def generate_badge(request: BadgeRequest, http_request: Request, response: Response,
+                         format: Optional[ResponseFormat] = Query(default=None)):
     """
     Generate a custom badge image from configuration
 
     Args:
         request: Badge configuration request
+        format: "raw" to receive the image bytes instead of JSON
 
     Returns:
         BadgeResponse with base64 encoded image and configuration
@@ -27,18 +200,13 @@ async def generate_badge(request: BadgeRequest):
     try:
         logger.info("Received badge generation request")
 
-        request_dict = request.model_dump()
-        result = await badge_service.generate_badge(request_dict)
-
-        # Add the input configuration to the response
-        result.config = {
-            "canvas": request_dict.get("canvas", {}),
-            "layers": request_dict.get("layers", [])
-        }
+        rendered = await _render_custom(request)
 
         logger.info("Badge generated successfully")
-        return result
 
+    except RenderQueueFullError as e:
+        logger.warning(f"Rejecting badge request: {str(e)}")
+        raise HTTPException(status_code=503, detail="Badge renderer is busy, please retry")
     except ValueError as e:
         logger.error(f"Invalid configuration: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -46,14 +214,18 @@ async def generate_badge(request: BadgeRequest):
         logger.error(f"Error generating badge: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate badge: {str(e)}")
 
+    return _respond(http_request, response, format, rendered)
 
-@router.post("/badge/generate-with-text", response_model=BadgeResponse)
-async def generate_badge_with_text(request: TextOverlayBadgeRequest):
+
+@router.post("/badge/generate-with-text", response_model=BadgeResponse, responses=RAW_IMAGE_RESPONSE)
+async def generate_badge_with_text(request: TextOverlayBadgeRequest, http_request: Request, response: Response,
+                                   format: Optional[ResponseFormat] = Query(default=None)):
     """
     Generate a badge with text overlay - generates config and renders in one call
 
     Args:
         request: Text overlay badge request with title, institute, and achievement phrase
+        format: "raw" to receive the image bytes instead of JSON
 
     Returns:
         BadgeResponse with base64 encoded image and configuration
@@ -61,29 +233,13 @@ async def generate_badge_with_text(request: TextOverlayBadgeRequest):
     try:
         logger.info(f"Generating text overlay badge: {request.short_title}")
 
-        # Step 1: Generate image config
-        config = generate_text_overlay_config(
-            short_title=request.short_title,
-            institute=request.institute or "",
-            achievement_phrase=request.achievement_phrase,
-            colors=request.colors,
-            seed=request.seed
-        )
-
-        # Step 2: Render badge image
-        badge_request = {
-            "canvas": {"bg": "white"},
-            "layers": config["layers"]
-        }
-
-        result = await badge_service.generate_badge(badge_request)
-
-        # Step 3: Add config to response
-        result.config = config
+        rendered = await _render_text(request)
 
         logger.info(f"Text overlay badge generated successfully: {request.short_title}")
-        return result
 
+    except RenderQueueFullError as e:
+        logger.warning(f"Rejecting badge request: {str(e)}")
+        raise HTTPException(status_code=503, detail="Badge renderer is busy, please retry")
     except ValueError as e:
         logger.error(f"Invalid configuration: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -91,14 +247,18 @@ async def generate_badge_with_text(request: TextOverlayBadgeRequest):
         logger.error(f"Error generating text overlay badge: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate badge: {str(e)}")
 
+    return _respond(http_request, response, format, rendered)
 
-@router.post("/badge/generate-with-icon", response_model=BadgeResponse)
-async def generate_badge_with_icon(request: IconBasedBadgeRequest):
+
+@router.post("/badge/generate-with-icon", response_model=BadgeResponse, responses=RAW_IMAGE_RESPONSE)
+async def generate_badge_with_icon(request: IconBasedBadgeRequest, http_request: Request, response: Response,
+                                   format: Optional[ResponseFormat] = Query(default=None)):
     """
     Generate a badge with icon - generates config and renders in one call
 
     Args:
         request: Icon-based badge request with icon name
+        format: "raw" to receive the image bytes instead of JSON
 
     Returns:
         BadgeResponse with base64 encoded image and configuration
@@ -106,30 +266,237 @@ async def generate_badge_with_icon(request: IconBasedBadgeRequest):
     try:
         logger.info(f"Generating icon-based badge with icon: {request.icon_name}")
 
-        # Step 1: Generate image config
-        config = generate_icon_based_config(
-            icon_name=request.icon_name,
-            colors=request.colors,
-            seed=request.seed
+        rendered = await _render_icon(request)
+
+        logger.info(f"Icon-based badge generated successfully with icon: {request.icon_name}")
+
+    except RenderQueueFullError as e:
+        logger.warning(f"Rejecting badge request: {str(e)}")
+        raise HTTPException(status_code=503, detail="Badge renderer is busy, please retry")
+    except ValueError as e:
+        logger.error(f"Invalid configuration: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error generating icon-based badge: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate badge: {str(e)}")
+
+    return _respond(http_request, response, format, rendered)
+
+
+def _variant_seeds(request: BadgeVariantsRequest) -> List[int]:
+    """Seeds to render: the explicit list, or count consecutive seeds"""
+    if request.seeds and request.count:
+        raise ValueError("Provide either seeds or count, not both")
+    if request.seeds:
+        seeds = list(dict.fromkeys(request.seeds))
+    elif request.count:
+        start = request.seed if request.seed is not None else random.randint(1, 10000)
+        seeds = [start + i for i in range(request.count)]
+    else:
+        raise ValueError("Provide either seeds or count")
+    if len(seeds) > settings.VARIANTS_MAX_COUNT:
+        raise ValueError(f"At most {settings.VARIANTS_MAX_COUNT} variants can be generated per request")
+    return seeds
+
+
+@router.post("/badge/variants", response_model=BadgeVariantsResponse)
+async def generate_badge_variants(request: BadgeVariantsRequest):
+    """
+    Generate several text overlay badges for one title, one per seed
+
+    Args:
+        request: Text overlay badge request plus either seeds or count
+
+    Returns:
+        BadgeVariantsResponse with one rendered variant per seed
+    """
+    try:
+        seeds = _variant_seeds(request)
+        logger.info(f"Generating {len(seeds)} variants of text overlay badge: {request.short_title}")
+
+        # Seeds already rendered through /badge/generate-with-text are reused as-is
+        base = request.model_dump(include=set(TextOverlayBadgeRequest.model_fields))
+        variants = {}
+        pending = []
+        for seed in seeds:
+            single = TextOverlayBadgeRequest(**{**base, "seed": seed})
+            cache_key = _seeded_key("text", single)
+            cached = _cached_badge(cache_key)
+            if cached:
+                variants[seed] = cached
+                continue
+            config = generate_text_overlay_config(
+                short_title=request.short_title,
+                institute=request.institute or "",
+                achievement_phrase=request.achievement_phrase,
+                colors=request.colors,
+                seed=seed
+            )
+            pending.append((seed, cache_key, config))
+
+        rendered_list = await badge_service.render_variants([
+            {"canvas": {"bg": "white"}, "layers": config["layers"]} for _, _, config in pending
+        ])
+        for (seed, cache_key, config), rendered in zip(pending, rendered_list):
+            rendered.config = config
+            _store_badge(cache_key, rendered)
+            variants[seed] = rendered
+
+        logger.info(f"Generated {len(seeds)} variants of text overlay badge: {request.short_title}")
+        return BadgeVariantsResponse(
+            success=True,
+            message=f"{len(seeds)} badge variants generated successfully",
+            variants=[
+                BadgeVariant(seed=seed, data=BadgeData(base64=variants[seed].data_uri()),
+                             config=variants[seed].config, cached=variants[seed].cached)
+                for seed in seeds
+            ],
         )
 
-        # Step 2: Render badge image
-        badge_request = {
-            "canvas": {"bg": "white"},
-            "layers": config["layers"]
-        }
+    except RenderQueueFullError as e:
+        logger.warning(f"Rejecting badge variants request: {str(e)}")
+        raise HTTPException(status_code=503, detail="Badge renderer is busy, please retry")
+    except ValueError as e:
+        logger.error(f"Invalid variants request: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error generating badge variants: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate badge variants: {str(e)}")
 
-        result = await badge_service.generate_badge(badge_request)
 
-        # Step 3: Add config to response
-        result.config = config
+@router.post("/badge/templates", response_model=TemplateResponse)
+async def register_template(request: TemplateRequest):
+    """
+    Register a badge configuration with {{placeholders}} as a reusable template
 
-        logger.info(f"Icon-based badge generated successfully with icon: {request.icon_name}")
-        return result
+    Layers without placeholders that sit below every variable layer are
+    pre-rendered once into a base plate; renders only draw the rest.
+
+    Args:
+        request: Badge configuration with placeholder strings, plus optional defaults
+
+    Returns:
+        TemplateResponse with the template id and its placeholders
+    """
+    try:
+        config = request.model_dump()
+        defaults = config.pop("defaults")
+        template = template_service.register(config, defaults)
+
+        return TemplateResponse(
+            success=True,
+            message="Template registered successfully",
+            template_id=template.id,
+            placeholders=list(template.placeholders),
+            plate_layers=len(template.plate_layers),
+        )
 
     except ValueError as e:
-        logger.error(f"Invalid configuration: {str(e)}")
+        logger.error(f"Invalid template: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error generating icon-based badge: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate badge: {str(e)}")
\ No newline at end of file
+        logger.error(f"Error registering template: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to register template: {str(e)}")
+
+
+@router.post("/badge/templates/{template_id}/render", response_model=BadgeResponse, responses=RAW_IMAGE_RESPONSE)
+async def render_template(template_id: str, request: TemplateRenderRequest, http_request: Request,
+                          response: Response, format: Optional[ResponseFormat] = Query(default=None)):
+    """
+    Render a registered template with placeholder values
+
+    Args:
+        template_id: Id returned when the template was registered
+        request: Placeholder values
+        format: "raw" to receive the image bytes instead of JSON
+
+    Returns:
+        BadgeResponse with base64 encoded image and the resolved configuration
+    """
+    template = template_service.get(template_id)
+    if template is None:
+        raise HTTPException(status_code=404, detail=f"Template not found: {template_id}")
+
+    try:
+        rendered = await template_service.render(template, request.values)
+
+    except RenderQueueFullError as e:
+        logger.warning(f"Rejecting template render: {str(e)}")
+        raise HTTPException(status_code=503, detail="Badge renderer is busy, please retry")
+    except ValueError as e:
+        logger.error(f"Invalid template values: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error rendering template {template_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate badge: {str(e)}")
+
+    return _respond(http_request, response, format, rendered)
+
+
+async def _render_batch_item(index: int, item: Union[BadgeRequest, TextOverlayBadgeRequest, IconBasedBadgeRequest]) -> dict:
+    """Render one batch item into its NDJSON record; failures become error records"""
+    try:
+        if isinstance(item, TextOverlayBadgeRequest):
+            rendered = await _render_text(item)
+        elif isinstance(item, IconBasedBadgeRequest):
+            rendered = await _render_icon(item)
+        else:
+            rendered = await _render_custom(item)
+        return {"index": index, **rendered.to_response().model_dump()}
+    except RenderQueueFullError as e:
+        logger.warning(f"Batch item {index} rejected: {str(e)}")
+        return {"index": index, "success": False, "status_code": 503,
+                "message": "Badge renderer is busy, please retry"}
+    except ValueError as e:
+        logger.error(f"Batch item {index} has an invalid configuration: {str(e)}")
+        return {"index": index, "success": False, "status_code": 400, "message": str(e)}
+    except Exception as e:
+        logger.error(f"Error generating batch item {index}: {str(e)}")
+        return {"index": index, "success": False, "status_code": 500,
+                "message": f"Failed to generate badge: {str(e)}"}
+
+
+@router.post(
+    "/badge/generate-batch",
+    responses={200: {"content": {"application/x-ndjson": {}},
+                     "description": "One JSON object per line, in completion order"}},
+)
+async def generate_badge_batch(request: BatchBadgeRequest):
+    """
+    Generate many badges in one call, streaming each result as it finishes
+
+    Items are rendered concurrently across the render workers. Every result is
+    written as one line of newline-delimited JSON: a BadgeResponse plus the
+    item's "index", or {"index", "success": false, "status_code", "message"}
+    for items that failed. A failed item does not fail the batch.
+
+    Args:
+        request: Batch of BadgeRequest, TextOverlayBadgeRequest or IconBasedBadgeRequest items
+
+    Returns:
+        StreamingResponse of application/x-ndjson records
+    """
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400,
+                            detail=f"Batch has {len(request.items)} items, the limit is {settings.BATCH_MAX_ITEMS}")
+
+    logger.info(f"Generating batch of {len(request.items)} badges")
+    # Keep at most one render per worker in flight so single requests still get queue slots
+    limit = asyncio.Semaphore(settings.BATCH_CONCURRENCY or render_executor.workers)
+
+    async def run(index, item):
+        async with limit:
+            return await _render_batch_item(index, item)
+
+    async def stream():
+        tasks = [asyncio.create_task(run(i, item)) for i, item in enumerate(request.items)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished, default=str) + "\n"
+        finally:
+            # Client went away before the batch finished
+            for task in tasks:
+                task.cancel()
+        logger.info(f"Batch of {len(request.items)} badges completed")
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -3,6 +3,13 @@ Health check controller
 """
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.encoder import encode_stats
+from app.core.render_executor import render_executor
+from app.core.utils.asset_store import asset_store
+from app.core.utils.cache import cache_fill_levels, cache_stats
+from app.core.utils.icon_atlas import icon_atlas
+from app.services.warmup_service import warmup_service
 
 router = APIRouter()
 
@@ -14,4 +21,50 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "badge-generator-api"
-    }
\ No newline at end of file
+    }
+
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness check endpoint
+
+    503 until the startup warm-up has finished and the render workers are
+    running; then reports how full the caches are. /health only reports
+    that the process is alive.
+    """
+    if not (warmup_service.done and render_executor.started):
+        return JSONResponse(status_code=503, content={
+            "status": "warming_up",
+            "warmup": warmup_service.stats()
+        })
+    return {
+        "status": "ready",
+        "warmup": warmup_service.stats(),
+        "caches": cache_fill_levels()
+    }
+
+@router.get("/health/caches")
+async def cache_health():
+    """
+    Hit/miss/eviction counters for the caches in this process
+
+    With the process render executor, asset/font/shape caches live in the
+    render workers; the counters here cover the API process (render cache).
+    """
+    return {
+        "status": "healthy",
+        "caches": cache_stats(),
+        "asset_store": asset_store.stats(),
+        "icon_atlas": icon_atlas.stats()
+    }
+
+
+@router.get("/health/encoding")
+async def encoding_health():
+    """
+    Encode count, average time and average size per output format
+    """
+    return {
+        "status": "healthy",
+        "formats": encode_stats.stats()
+    }
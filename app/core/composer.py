@@ -1,10 +1,126 @@
+import hashlib
 import json
+import time
+from dataclasses import dataclass
+from typing import Any, Collection, Optional, Tuple
 from PIL import Image
 from app.core.layers import LAYER_REGISTRY
+from app.core.layers.base import Layer
 from app.core.layers.shape import ShapeLayer
 from app.core.layers.image import LogoLayer
 from app.core.layers.text import TextLayer
-from app.core.utils.geometry import get_shape_bounds
+from app.core.timing import Timings, timed
+from app.core.utils.geometry import clip_rect, get_shape_bounds
+from app.settings import settings
+
+
+def _main_shape(layers, W, H):
+    """Spec and bounds of the first shape layer, used for dynamic positioning"""
+    for layer in layers:
+        if isinstance(layer, ShapeLayer):
+            shape_spec = {
+                "shape": layer.shape,
+                "params": layer.params
+            }
+            return shape_spec, get_shape_bounds(shape_spec, W, H)
+    return None, None
+
+
+def _resolve_dynamic_positions(layers, bounds):
+    """Copies of layers with "dynamic" positions replaced by coordinates; layers are not modified"""
+    if not bounds:
+        return list(layers)
+    
+    # Calculate dynamic positions based on hexagon bounds
+    hexagon_height = bounds["bottom"] - bounds["top"]
+    hexagon_center_y = bounds["top"] + hexagon_height * 0.5  # Center of hexagon
+    
+    # Get dynamic logo height for positioning calculations
+    logo_height = 85  # Default fallback
+    for layer in layers:
+        if isinstance(layer, LogoLayer):
+            if layer.size.get("dynamic", False):
+                _, logo_height = layer.get_dynamic_size()
+            else:
+                logo_height = layer.size.get("height", 85)
+            break
+    
+    # Position elements based on calculated percentages:
+    # Logo CENTER should be at 25% from top (more consistent across different logo sizes)
+    logo_center_y = bounds["top"] + hexagon_height * 0.25  # Logo center: 25% from top
+    logo_y = logo_center_y - (logo_height / 2)             # Adjust to top edge for rendering
+    text1_y = bounds["top"] + hexagon_height * 0.43      # Title: 43% from top 
+    text2_y = bounds["top"] + hexagon_height * 0.62       # Subtitle: 62% from top 
+    skill_rect_y = hexagon_center_y + hexagon_height * 0.25  # Skill badge: 25% below center
+
+    # Calculate skill text position to be centered within the rectangle
+    # Rectangle height is 40, so text should be at rectangle center
+    skill_text_y = skill_rect_y  # This will be the center of the rectangle
+    
+    # No dynamic rectangle positioning needed - rectangles handle their own centering
+    
+    # Track which dynamic text layers we've encountered
+    text_layer_count = 0
+    text_ys = (text1_y, text2_y, skill_text_y)
+    
+    resolved = []
+    for layer in layers:
+        if isinstance(layer, LogoLayer):
+            if layer.pos.get("y") == "dynamic":
+                # Position logo at the top of content area (logo_y is already the top position)
+                layer = layer.replace(pos={**layer.pos, "y": int(logo_y)})
+        
+        elif isinstance(layer, TextLayer):
+            if layer.align.get("y") == "dynamic":
+                # Title, subtitle, then skill text; any further dynamic text stays as is
+                if text_layer_count < len(text_ys):
+                    layer = layer.replace(align={**layer.align, "y": int(text_ys[text_layer_count])})
+                text_layer_count += 1
+        resolved.append(layer)
+    return resolved
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    """One layer of a RenderPlan and the canvas box it paints"""
+    layer: Layer
+    rect: Tuple[int, int, int, int]
+    index: int = 0  # position in z order; names the layer's timing span
+
+
+@dataclass(frozen=True)
+class RenderPlan:
+    """A compiled badge: canvas size, background and z-ordered, fully resolved layers.
+
+    Plans hold no per-render state, so one plan can be rendered any number of
+    times, including from several threads at once.
+    """
+    size: Tuple[int, int]
+    bg: Any
+    steps: Tuple[PlanStep, ...]
+
+    def render(self, base: Optional[Image.Image] = None, timings: Optional[Timings] = None) -> Image.Image:
+        """Render onto a fresh canvas, or onto a copy of base (e.g. a template's base plate)
+
+        timings, if given, gets each layer's draw time added to its span.
+        """
+        if settings.COMPOSITOR == "numpy":
+            from app.core.numpy_compositor import render_plan
+            return render_plan(self, base, timings)
+        
+        canvas = base.copy() if base is not None else Image.new("RGBA", self.size, self.bg)
+        
+        # Layers that report a dirty rectangle are rendered and blended over that region only
+        for step in self.steps:
+            start = time.perf_counter() if timings is not None else 0.0
+            tile = step.layer.render_tile(self.size, step.rect)
+            if tile is None:
+                step.layer.render(canvas)
+            else:
+                canvas.alpha_composite(tile, dest=step.rect[:2])
+            if timings is not None:
+                timings.add_layer(step.index, step.layer, time.perf_counter() - start)
+        return canvas
 
 
 class Composer:
@@ -12,125 +128,46 @@ class Composer:
         self.W, self.H = int(width), int(height)
         self.bg = bg
         self.layers = []
-        self.shape_bounds = None
-        self.shape_spec = None
     
     def add(self, layer):
         self.layers.append(layer)
         return self
     
-    def _calculate_shape_bounds(self):
-        """Find the first shape layer and calculate its bounds"""
-        for layer in self.layers:
-            if isinstance(layer, ShapeLayer):
-                # Get the original layer spec to calculate bounds
-                self.shape_spec = {
-                    "shape": layer.shape,
-                    "params": layer.params
-                }
-                self.shape_bounds = get_shape_bounds(self.shape_spec, self.W, self.H)
-                break
-    
-    def _update_dynamic_positions(self):
-        """Update positions of layers that use dynamic positioning"""
-        if not self.shape_bounds:
-            return
-        
-        bounds = self.shape_bounds
-        
-        # Calculate dynamic positions based on hexagon bounds
-        hexagon_height = bounds["bottom"] - bounds["top"]
-        hexagon_center_y = bounds["top"] + hexagon_height * 0.5  # Center of hexagon
-        
-        # Get dynamic logo height for positioning calculations
-        logo_height = 85  # Default fallback
-        for layer in self.layers:
-            if isinstance(layer, LogoLayer):
-                if layer.size.get("dynamic", False):
-                    _, logo_height = layer.get_dynamic_size()
-                else:
-                    logo_height = layer.size.get("height", 85)
-                break
-        
-        # Position elements based on calculated percentages:
-        # Logo CENTER should be at 25% from top (more consistent across different logo sizes)
-        logo_center_y = bounds["top"] + hexagon_height * 0.25  # Logo center: 25% from top
-        logo_y = logo_center_y - (logo_height / 2)             # Adjust to top edge for rendering
-        text1_y = bounds["top"] + hexagon_height * 0.43      # Title: 43% from top 
-        text2_y = bounds["top"] + hexagon_height * 0.62       # Subtitle: 62% from top 
-        skill_rect_y = hexagon_center_y + hexagon_height * 0.25  # Skill badge: 25% below center
-
-        # Calculate skill text position to be centered within the rectangle
-        # Rectangle height is 40, so text should be at rectangle center
-        skill_text_y = skill_rect_y  # This will be the center of the rectangle
-        
-        # First pass: Position rectangle and calculate its center for text
-        skill_rectangle_center_y = None
-        
-        # No dynamic rectangle positioning needed - rectangles handle their own centering
-        
-        # Track which dynamic text layers we've encountered
-        text_layer_count = 0
+    def compile(self, include: Optional[Collection[int]] = None, timings: Optional[Timings] = None) -> RenderPlan:
+        """
+        Resolve shape bounds, dynamic positions, fonts and text layout into a RenderPlan
+
+        Args:
+            include: Indices into self.layers to put in the plan (default: all). The
+                other layers still take part in dynamic positioning.
+            timings: Optional Timings; each layer's compile time starts its span
+
+        Returns:
+            RenderPlan with the included layers in z order
+        """
+        size = (self.W, self.H)
+        shape_spec, bounds = _main_shape(self.layers, self.W, self.H)
+        layers = _resolve_dynamic_positions(self.layers, bounds)
+        if include is not None:
+            layers = [layers[i] for i in sorted(include)]
         
-        # Second pass: Update all other layer positions
-        for layer in self.layers:
-            if isinstance(layer, LogoLayer):
-                if layer.pos.get("y") == "dynamic":
-                    # Position logo at the top of content area (logo_y is already the top position)
-                    layer.pos["y"] = int(logo_y)
-            
-            elif isinstance(layer, TextLayer):
-                if layer.align.get("y") == "dynamic":
-                    # Determine position based on which text layer this is
-                    if text_layer_count == 0:  # First text layer (title)
-                        layer.align["y"] = int(text1_y)
-                    elif text_layer_count == 1:  # Second text layer (subtitle)
-                        layer.align["y"] = int(text2_y)
-                    elif text_layer_count == 2:  # Third text layer (skill)
-                        # Position text so it's visually centered within the rectangle
-                        if skill_rectangle_center_y is not None:
-                            # Get font size to estimate text height
-                            font_size = layer.font.get('size', 36)
-                            # Estimate text height (roughly 70% of font size for most fonts)
-                            estimated_text_height = font_size * 0.7
-                            
-                            # Calculate Y position so text is centered in rectangle
-                            # Since text uses anchor="lt" (left-top), we need to position the top of the text
-                            # at: rectangle_center - (text_height / 2)
-                            centered_text_y = skill_rectangle_center_y - (estimated_text_height / 2)
-                            layer.align["y"] = int(centered_text_y)
-                        else:
-                            layer.align["y"] = int(skill_text_y)  # Fallback
-                    text_layer_count += 1
+        steps = []
+        for index, layer in enumerate(sorted(layers, key=lambda L: L.z)):
+            start = time.perf_counter() if timings is not None else 0.0
+            layer = layer.compile(size, shape_spec)
+            step = PlanStep(layer, clip_rect(layer.dirty_rect(size), size), index)
+            if step.rect is not None:
+                steps.append(step)
+            if timings is not None:
+                timings.add_layer(step.index, step.layer, time.perf_counter() - start)
+        return RenderPlan(size, self.bg, tuple(steps))
     
-    def render(self):
-        # Calculate shape bounds and update dynamic positions first
-        self._calculate_shape_bounds()
-        self._update_dynamic_positions()
-        
-        # Pass composer reference to TextLayers that need dynamic wrapping
-        for layer in self.layers:
-            if isinstance(layer, TextLayer) and layer.wrap.get("dynamic", False):
-                layer.composer = self
-        
-        canvas = Image.new("RGBA", (self.W, self.H), self.bg)
-        
-        for layer in sorted(self.layers, key=lambda L: L.z):
-            layer.render(canvas)
-        
-        # Clean up composer references
-        for layer in self.layers:
-            if isinstance(layer, TextLayer):
-                layer.composer = None
-        
-        return canvas
+    def render(self, timings: Optional[Timings] = None):
+        return self.compile(timings=timings).render(timings=timings)
 
 
-def render_from_spec(spec):
-    """spec: dict or JSON string with keys:
-       - canvas: {bg, scale_factor} (width and height are fixed at 600)
-       - layers: [ {type: "...", ...}, ... ]
-    """
+def build_composer(spec):
+    """Parse a spec (dict or JSON string) into a Composer with its layers added"""
     if isinstance(spec, str):
         spec = json.loads(spec)
     canvas = spec.get("canvas", {})
@@ -146,4 +183,40 @@ def render_from_spec(spec):
         if not cls:
             raise ValueError(f"Unknown layer type: {t}")
         comp.add(cls(layer_spec))
-    return comp.render()
\ No newline at end of file
+    return comp
+
+
+def spec_fingerprint(spec):
+    """Content hash of a spec after defaults are filled in.
+
+    Two specs that render the same image (differing only in key order or in
+    values left at their defaults) get the same fingerprint.
+    """
+    comp = build_composer(spec)
+    canonical = {
+        "canvas": {"size": [comp.W, comp.H], "bg": comp.bg},
+        "layers": [layer.describe() for layer in comp.layers],
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compile_spec(spec, include=None) -> RenderPlan:
+    """spec: dict or JSON string with keys:
+       - canvas: {bg, scale_factor} (width and height are fixed at 600)
+       - layers: [ {type: "...", ...}, ... ]
+       include: optional indices of the layers to compile (see Composer.compile)
+    """
+    return build_composer(spec).compile(include)
+
+
+def render_from_spec(spec, timings: Optional[Timings] = None):
+    """Compile a spec and render it once (see compile_spec)
+
+    timings, if given, gets a "parse" span, one span per layer (compile plus
+    draw) and a "render" span for compiling and drawing the whole badge.
+    """
+    with timed(timings, "parse"):
+        comp = build_composer(spec)
+    with timed(timings, "render"):
+        return comp.render(timings)
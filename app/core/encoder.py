@@ -0,0 +1,136 @@
+"""
+Output encoder - turns a rendered canvas into PNG, WebP or AVIF bytes
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+from PIL import Image, features
+
+from app.core.timing import Timings
+from app.settings import settings
+
+# format name -> (Pillow format, media type)
+FORMATS = {
+    "png": ("PNG", "image/png"),
+    "webp": ("WEBP", "image/webp"),        # lossless
+    "webp_lossy": ("WEBP", "image/webp"),
+    "avif": ("AVIF", "image/avif"),
+}
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    """How a badge is encoded; unset fields fall back to Settings"""
+    format: str = "png"
+    compress_level: int = 6
+    optimize: bool = False
+    quality: int = 80
+
+    @classmethod
+    def from_canvas(cls, canvas: Optional[Dict[str, Any]]) -> "EncodeOptions":
+        """Read output options from a spec's canvas, filling gaps from Settings"""
+        canvas = canvas or {}
+
+        def pick(key, default):
+            value = canvas.get(key)
+            return default if value is None else value
+
+        options = cls(
+            format=str(pick("format", settings.OUTPUT_FORMAT)).lower(),
+            compress_level=int(pick("compress_level", settings.PNG_COMPRESS_LEVEL)),
+            optimize=bool(pick("optimize", settings.PNG_OPTIMIZE)),
+            quality=int(pick("quality", settings.OUTPUT_QUALITY)),
+        )
+        options.validate()
+        return options
+
+    def validate(self):
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown output format: {self.format}")
+        if self.format == "avif" and not features.check("avif"):
+            raise ValueError("AVIF output is not available in this Pillow build")
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.format][1]
+
+    def cache_key(self) -> str:
+        """Only the options that affect the given format's output"""
+        if self.format == "png":
+            return f"png:{self.compress_level}:{int(self.optimize)}"
+        if self.format == "webp":
+            return "webp"
+        return f"{self.format}:{self.quality}"
+
+    def save_kwargs(self) -> Dict[str, Any]:
+        if self.format == "png":
+            return {"compress_level": self.compress_level, "optimize": self.optimize}
+        if self.format == "webp":
+            return {"lossless": True}
+        return {"quality": self.quality}
+
+
+@dataclass
+class EncodedImage:
+    data: bytes
+    format: str
+    media_type: str
+    encode_seconds: float
+    timings: Optional[Timings] = None  # render spans, when the worker was asked to time the render
+
+
+def encode_image(image: Image.Image, options: EncodeOptions) -> EncodedImage:
+    """
+    Encode an image with the given options
+
+    Args:
+        image: Rendered RGBA canvas
+        options: Output format and compression options
+
+    Returns:
+        EncodedImage with the bytes and how long encoding took
+    """
+    pil_format, media_type = FORMATS[options.format]
+    start = time.perf_counter()
+    buffer = BytesIO()
+    image.save(buffer, format=pil_format, **options.save_kwargs())
+    return EncodedImage(
+        data=buffer.getvalue(),
+        format=options.format,
+        media_type=media_type,
+        encode_seconds=time.perf_counter() - start,
+    )
+
+
+class EncodeStats:
+    """Per-format encode counts, time and output size"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, encoded: EncodedImage):
+        with self._lock:
+            s = self._stats.setdefault(encoded.format, {"count": 0, "seconds": 0.0, "bytes": 0})
+            s["count"] += 1
+            s["seconds"] += encoded.encode_seconds
+            s["bytes"] += len(encoded.data)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                fmt: {
+                    "count": s["count"],
+                    "total_seconds": round(s["seconds"], 6),
+                    "avg_ms": round(s["seconds"] / s["count"] * 1000, 3),
+                    "avg_bytes": int(s["bytes"] / s["count"]),
+                }
+                for fmt, s in self._stats.items()
+            }
+
+
+encode_stats = EncodeStats()
@@ -1,6 +1,6 @@
-from PIL import Image, ImageDraw
+from PIL import ImageDraw
 from app.core.layers.base import Layer
-from app.core.utils.image_processing import make_linear_gradient
+from app.core.utils.image_processing import gradient_from_spec
 
 
 class BackgroundLayer(Layer):
@@ -14,8 +14,4 @@ class BackgroundLayer(Layer):
         if self.mode == "solid":
             ImageDraw.Draw(canvas).rectangle([0,0,canvas.width,canvas.height], fill=self.color)
         else:
-            grad = make_linear_gradient((canvas.width, canvas.height),
-                                        self.gradient.get("start_color","#FFFFFF"),
-                                        self.gradient.get("end_color",  "#FFFFFF"),
-                                        self.gradient.get("vertical", True))
-            canvas.alpha_composite(grad)
\ No newline at end of file
+            canvas.alpha_composite(gradient_from_spec((canvas.width, canvas.height), self.gradient))
\ No newline at end of file
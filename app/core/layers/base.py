@@ -1,9 +1,44 @@
+import copy
 from PIL import Image
+from app.core.utils.geometry import clip_rect
 
 
 class Layer:
+    # Attributes that are set while rendering and are not part of the layer's spec
+    TRANSIENT_ATTRS = ()
+
     def __init__(self, spec):
         self.z = int(spec.get("z", 0))
-    
+
+    def describe(self):
+        """The layer's resolved spec (defaults filled in), used for content hashing"""
+        attrs = {k: v for k, v in vars(self).items() if k not in self.TRANSIENT_ATTRS}
+        return {"type": type(self).__name__, **attrs}
+
+    def replace(self, **attrs):
+        """Shallow copy with the given attributes replaced; layers are not mutated once built"""
+        layer = copy.copy(self)
+        layer.__dict__.update(attrs)
+        return layer
+
+    def compile(self, size, shape_spec=None):
+        """Render-ready layer for a canvas of size (W, H) with everything that depends on
+        the canvas or the main shape resolved; returns self or a copy, never mutates self"""
+        return self
+
+    def dirty_rect(self, size):
+        """Box (x0, y0, x1, y1) this layer may paint on a canvas of size (W, H), or None if nothing"""
+        return (0, 0, size[0], size[1])
+
+    def render_tile(self, size, rect):
+        """RGBA tile covering rect for the Composer to alpha-composite at rect's origin,
+        or None if the layer draws onto the canvas itself in render()"""
+        return None
+
     def render(self, canvas: Image.Image):
-        raise NotImplementedError
\ No newline at end of file
+        rect = clip_rect(self.dirty_rect(canvas.size), canvas.size)
+        if rect is None: return
+        tile = self.render_tile(canvas.size, rect)
+        if tile is None:
+            raise NotImplementedError
+        canvas.alpha_composite(tile, dest=rect[:2])
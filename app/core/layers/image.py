@@ -1,18 +1,27 @@
 import os
-from PIL import Image
 from PIL.Image import Resampling
 from app.core.layers.base import Layer
+from app.core.utils.geometry import fit_size
+from app.core.utils.image_cache import image_size, load_image
+from app.core.utils.paths import resolve_asset_path
 from app.core.utils.text import resolve_align
 
+# Boxes {"size": {"dynamic": true}} fits images into, unless max_width/max_height are given
+ICON_DYNAMIC_BOX = (190, 190)
+DYNAMIC_BOX = (280, 120)
+
+
+def is_icon(path):
+    return "icons" in path.lower()
+
 
 class ImageLayer(Layer):
+    # Resolved by compile(); not part of the spec
+    TRANSIENT_ATTRS = ("resolved_image",)
+    
     def __init__(self, spec):
         super().__init__(spec)
-        
-        # Get project root (go up from app/core/layers to project root)
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(script_dir)))
-        self.path = os.path.join(project_root, spec.get("path"))
+        self.path = resolve_asset_path(spec.get("path"))
         
         # Support both simple numeric size and object format
         if isinstance(spec.get("size"), (int, float)):
@@ -36,63 +45,68 @@ class ImageLayer(Layer):
             self.pos = spec.get("position", {"x":"center","y":"center"})
         
         self.opacity = float(spec.get("opacity", 1.0))
+        self.resolved_image = None
     
-    def render(self, canvas):
-        if not (self.path and os.path.exists(self.path)): return
-        img = Image.open(self.path).convert("RGBA")
+    def _target_size(self):
+        """Size the image is drawn at, or None to keep its original size"""
+        ow, oh = image_size(self.path)
         
         # Handle dynamic sizing with aspect ratio preservation
         if self.size.get("dynamic", False) or self.size.get("max_width"):
-            img = self._resize_dynamic(img, canvas)
+            return self._dynamic_size(ow, oh)
+        # Original static sizing logic
+        w, h = self.size.get("width"), self.size.get("height")
+        if w and h: return (int(w), int(h))
+        elif w:     return (int(w), int(oh*(w/ow)))
+        elif h:     return (int(ow*(h/oh)), int(h))
+        return None
+    
+    def _image(self):
+        """Decoded image at its drawn size (shared; do not mutate)"""
+        if self.resolved_image is not None:
+            return self.resolved_image
+        return load_image(self.path, self._target_size(), Resampling.LANCZOS)
+    
+    def compile(self, size, shape_spec=None):
+        if not (self.path and os.path.exists(self.path)): return self
+        return self.replace(resolved_image=self._image())
+    
+    def dirty_rect(self, size):
+        if self.resolved_image is not None:
+            w, h = self.resolved_image.size
+        elif not (self.path and os.path.exists(self.path)):
+            return None
         else:
-            # Original static sizing logic
-            w, h = self.size.get("width"), self.size.get("height")
-            if w or h:
-                ow, oh = img.size
-                if w and h: img = img.resize((int(w), int(h)), Resampling.LANCZOS)
-                elif w:     img = img.resize((int(w), int(oh*(w/ow))), Resampling.LANCZOS)
-                else:       img = img.resize((int(ow*(h/oh)), int(h)), Resampling.LANCZOS)
+            w, h = self._target_size() or image_size(self.path)
+        x,y = resolve_align(self.pos, w, h, size[0], size[1])
+        return (x, y, x + w, y + h)
+    
+    def render_tile(self, size, rect):
+        x0, y0, _, _ = self.dirty_rect(size)
+        img = self._image()
+        if rect != (x0, y0, x0 + img.width, y0 + img.height):
+            # Partly off-canvas: keep only the visible part
+            img = img.crop((rect[0]-x0, rect[1]-y0, rect[2]-x0, rect[3]-y0))
         
         if self.opacity < 1.0:
-            a = img.split()[-1].point(lambda p: int(p*self.opacity))
+            a = img.getchannel("A").point(lambda p: int(p*self.opacity))
+            img = img.copy()  # cached images are shared
             img.putalpha(a)
-        x,y = resolve_align(self.pos, img.width, img.height, canvas.width, canvas.height)
-        canvas.alpha_composite(img, dest=(x,y))
+        return img
     
-    def _resize_dynamic(self, img, canvas):
-        """Dynamically resize image while maintaining aspect ratio"""
-        original_width, original_height = img.size
-
-        # Check if this is an icon path
-        is_icon = "icons" in self.path.lower()
-
+    def _dynamic_size(self, original_width, original_height):
+        """Calculate the dynamically resized dimensions, maintaining aspect ratio"""
         # Get maximum dimensions from config
         # For icons with dynamic: true, default to 190x190 instead of 280x120
-        if is_icon and self.size.get("dynamic") and "max_width" not in self.size:
-            max_width = self.size.get("max_width", 190)
-            max_height = self.size.get("max_height", 190)
+        if is_icon(self.path) and self.size.get("dynamic") and "max_width" not in self.size:
+            max_width = self.size.get("max_width", ICON_DYNAMIC_BOX[0])
+            max_height = self.size.get("max_height", ICON_DYNAMIC_BOX[1])
         else:
-            max_width = self.size.get("max_width", 280)
-            max_height = self.size.get("max_height", 120)
-        
-        # Calculate scaling factors
-        width_ratio = max_width / original_width
-        height_ratio = max_height / original_height
-        
-        # Use the smaller ratio to maintain aspect ratio
-        ratio = min(width_ratio, height_ratio)
+            max_width = self.size.get("max_width", DYNAMIC_BOX[0])
+            max_height = self.size.get("max_height", DYNAMIC_BOX[1])
         
-        # Ensure we don't upscale too much
-        if ratio > 1.0:
-            max_upscale = self.size.get("max_upscale", 2.0)
-            ratio = min(ratio, max_upscale)
-        
-        # Calculate new dimensions
-        new_width = int(original_width * ratio)
-        new_height = int(original_height * ratio)
-        
-        # Resize the image
-        return img.resize((new_width, new_height), Resampling.LANCZOS)
+        return fit_size((original_width, original_height), (max_width, max_height),
+                        self.size.get("max_upscale", 2.0))
     
     def get_dynamic_size(self):
         """Get the calculated size for dynamic sizing (for positioning calculations)"""
@@ -100,30 +114,8 @@ class ImageLayer(Layer):
             return self.size.get("width", 0), self.size.get("height", 0)
 
         try:
-            with Image.open(self.path) as img:
-                original_width, original_height = img.size
-
-                # Check if this is an icon path
-                is_icon = "icons" in self.path.lower()
-
-                # Get maximum dimensions with icon-specific defaults
-                if is_icon and self.size.get("dynamic") and "max_width" not in self.size:
-                    max_width = self.size.get("max_width", 190)
-                    max_height = self.size.get("max_height", 190)
-                else:
-                    max_width = self.size.get("max_width", 280)
-                    max_height = self.size.get("max_height", 120)
-                
-                width_ratio = max_width / original_width
-                height_ratio = max_height / original_height
-                ratio = min(width_ratio, height_ratio)
-                
-                if ratio > 1.0:
-                    max_upscale = self.size.get("max_upscale", 2.0)
-                    ratio = min(ratio, max_upscale)
-                
-                return int(original_width * ratio), int(original_height * ratio)
-        except:
+            return self._dynamic_size(*image_size(self.path))
+        except Exception:
             return self.size.get("max_width", 280), self.size.get("max_height", 120)
 
 
@@ -1,10 +1,17 @@
-import math
-from PIL import Image, ImageDraw
+from PIL import Image, ImageChops, ImageColor
 from app.core.layers.base import Layer
-from app.core.utils.image_processing import (
-    make_linear_gradient, circle_mask, 
-    polygon_mask, rounded_rect_mask, shield_points
-)
+from app.core.utils.geometry import crop_to_rect
+from app.core.utils.image_processing import gradient_from_spec
+from app.core.utils.shapes import shape_coverage, shape_mask
+
+
+def _apply_mask(img, mask):
+    """Multiply img's alpha by mask in place and return img"""
+    alpha = img.getchannel("A")
+    if alpha.getextrema() != (255, 255):
+        mask = ImageChops.multiply(alpha, mask)
+    img.putalpha(mask)
+    return img
 
 
 class ShapeLayer(Layer):
@@ -14,101 +21,37 @@ class ShapeLayer(Layer):
         self.fill = spec.get("fill", {"mode":"solid","color":"#FFFFFF"})  # "transparent" allowed
         self.border = spec.get("border", {"color": None, "width": 0})
         self.params = spec.get("params", {})
-    
+
     def _mask(self, size):
-        W, H = size
-        s = self.shape
-        if s == "hexagon":
-            r = int(self.params.get("radius", min(W,H)//2 - 20))
-            cx, cy = W//2, H//2
-            ang = math.pi/3
-            pts = [(cx + r*math.cos(i*ang), cy + r*math.sin(i*ang)) for i in range(6)]
-            return polygon_mask(size, pts)
-        if s == "circle":
-            #return circle_mask(size, int(self.params.get("margin", 50)))
-            radius = int(self.params.get("radius", min(W,H)//2 - 50))
-            margin = max(0, (min(W,H)//2) - radius)
-            return circle_mask(size, margin)
-        if s == "shield":
-            margin = int(self.params.get("margin", 56))
-            r      = int(self.params.get("corner_radius", 56))
-            tip_h  = int(self.params.get("tip_height", 110))
-            rect, tip = shield_points(W,H,margin,r,tip_h)
-            m = Image.new("L", size, 0); d = ImageDraw.Draw(m)
-            d.rounded_rectangle(rect, radius=r, fill=255)
-            d.polygon(tip, fill=255)
-            return m
-        if s == "rounded_rect":
-            # Use width, height, radius instead of rect coordinates
-            width = int(self.params.get("width", 450))
-            height = int(self.params.get("height", 450))
-            radius = int(self.params.get("radius", 50))
-            
-            # Center the rectangle on canvas
-            cx, cy = W//2, H//2
-            x1 = cx - width//2
-            y1 = cy - height//2
-            x2 = cx + width//2
-            y2 = cy + height//2
-            
-            rect = [x1, y1, x2, y2]
-            return rounded_rect_mask(size, rect, radius)
-        raise ValueError(f"Unknown shape: {s}")
-    
-    def render(self, canvas):
-        W, H = canvas.width, canvas.height
-        m = self._mask((W,H))
+        return shape_mask(self.shape, self.params, size)
+
+    def _border_width(self):
+        return int(self.border.get("width", 0)) if self.border.get("color") else 0
+
+    def _coverage(self, size):
+        return shape_coverage(self.shape, self.params, size, self._border_width())
+
+    def dirty_rect(self, size):
+        return self._coverage(size).rect
+
+    def render_tile(self, size, rect):
+        cov = self._coverage(size)
+        w, h = rect[2] - rect[0], rect[3] - rect[1]
+        tile = None
         # Fill
         mode = self.fill.get("mode","solid")
-        if mode == "transparent":
-            pass
-        else:
+        if mode != "transparent":
             if mode == "solid":
-                fill_img = Image.new("RGBA", (W,H), self.fill.get("color","#FFFFFF"))
+                tile = Image.new("RGBA", (w,h), self.fill.get("color","#FFFFFF"))
+            else:
+                tile = gradient_from_spec(size, self.fill).crop(rect)
+            _apply_mask(tile, crop_to_rect(cov.fill, cov.rect, rect))
+        # Border - the outline is cached as coverage, colour is applied here
+        if cov.border is not None:
+            bd = Image.new("RGBA", (w,h), ImageColor.getcolor(self.border["color"], "RGBA"))
+            _apply_mask(bd, crop_to_rect(cov.border, cov.rect, rect))
+            if tile is None:
+                tile = bd
             else:
-                fill_img = make_linear_gradient((W,H),
-                    self.fill.get("start_color","#FFFFFF"),
-                    self.fill.get("end_color","#FFFFFF"),
-                    self.fill.get("vertical",True))
-            tmp = Image.new("RGBA", (W,H), (0,0,0,0))
-            tmp.paste(fill_img, (0,0), m)
-            canvas.alpha_composite(tmp)
-        # Border
-        col = self.border.get("color"); bw = int(self.border.get("width", 0))
-        if col and bw > 0:
-            bd = Image.new("RGBA", (W,H), (0,0,0,0))
-            d  = ImageDraw.Draw(bd)
-            s = self.shape
-            if s == "hexagon":
-                r = int(self.params.get("radius", min(W,H)//2 - 20))
-                cx, cy = W//2, H//2; ang = math.pi/3
-                pts = [(cx + r*math.cos(i*ang), cy + r*math.sin(i*ang)) for i in range(6)]
-                d.polygon(pts, outline=col, width=bw)
-            elif s == "circle":
-                #margin = int(self.params.get("margin", 50))
-                radius = int(self.params.get("radius", min(W,H)//2 - 50))
-                margin = max(0, (min(W,H)//2) - radius)
-                d.ellipse([margin, margin, W-margin, H-margin], outline=col, width=bw)
-            elif s == "shield":
-                margin = int(self.params.get("margin", 56))
-                r      = int(self.params.get("corner_radius", 56))
-                tip_h  = int(self.params.get("tip_height", 110))
-                rect, tip = shield_points(W,H,margin,r,tip_h)
-                d.rounded_rectangle(rect, radius=r, outline=col, width=bw)
-                d.line(tip + [tip[0]], fill=col, width=bw, joint="curve")
-            elif s == "rounded_rect":
-                # Use width, height, radius instead of rect coordinates
-                width = int(self.params.get("width", 450))
-                height = int(self.params.get("height", 450))
-                radius = int(self.params.get("radius", 50))
-                
-                # Center the rectangle on canvas
-                cx, cy = W//2, H//2
-                x1 = cx - width//2
-                y1 = cy - height//2
-                x2 = cx + width//2
-                y2 = cy + height//2
-                
-                rect = [x1, y1, x2, y2]
-                d.rounded_rectangle(rect, radius=radius, outline=col, width=bw)
-            canvas.alpha_composite(bd)
\ No newline at end of file
+                tile.alpha_composite(bd)
+        return tile if tile is not None else Image.new("RGBA", (w,h), (0,0,0,0))
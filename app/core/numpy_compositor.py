@@ -0,0 +1,247 @@
+"""
+NumPy compositing backend (COMPOSITOR=numpy)
+
+The canvas is one premultiplied RGBA uint8 array for the whole render. Layers
+are blended into it in place:
+
+- Opaque sources under a hard-edged mask (solid/gradient shape fills, borders,
+  solid backgrounds) are a single masked copy of 32-bit pixels.
+- Everything else uses the premultiplied "over" operator in uint16.
+
+Shape masks, gradients and decoded images come from the shared caches and
+are converted to arrays once. The array is turned back into a PIL image only
+when the render is finished, right before encoding.
+"""
+
+import time
+from typing import Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError('COMPOSITOR=numpy requires numpy; install it with pip install ".[numpy]"') from e
+from PIL import Image, ImageColor, ImageDraw
+
+from app.core.layers.background import BackgroundLayer
+from app.core.layers.image import ImageLayer, LogoLayer
+from app.core.layers.shape import ShapeLayer
+from app.core.layers.text import TextLayer
+from app.core.timing import Timings
+from app.core.utils.cache import LRUCache
+from app.core.utils.geometry import crop_to_rect
+from app.core.utils.image_processing import gradient_from_spec
+from app.core.utils.text import resolve_align
+from app.settings import settings
+
+# Array views of cached (shared, immutable) PIL images, keyed by object identity
+array_cache = LRUCache("compositor_arrays", max_bytes=settings.COMPOSITOR_ARRAY_CACHE_MAX_BYTES)
+
+
+def _cached_array(kind: str, img: Image.Image, build):
+    key = (kind, id(img))
+    entry = array_cache.get(key)
+    if entry is None or entry[0] is not img:
+        # The image is kept alive by the entry, so its id can't be reused while cached
+        entry = (img, build(img))
+        array_cache.put(key, entry, entry[1].nbytes)
+    return entry[1]
+
+
+def _premultiply(rgba: np.ndarray) -> np.ndarray:
+    a = rgba[..., 3:4].astype(np.uint16)
+    out = rgba.astype(np.uint16) * a + 128
+    out = (out + (out >> 8)) >> 8
+    out[..., 3:4] = a
+    return out.astype(np.uint8)
+
+
+def premultiplied(img: Image.Image) -> np.ndarray:
+    """Premultiplied (H, W, 4) uint8 array of a shared RGBA image"""
+    return _cached_array("rgba", img, lambda im: _premultiply(np.asarray(im.convert("RGBA"))))
+
+
+def _is_opaque(img: Image.Image) -> bool:
+    return bool(_cached_array("opaque", img,
+                              lambda im: np.array(im.getchannel("A").getextrema() == (255, 255))))
+
+
+def _mask_array(mask: Image.Image) -> np.ndarray:
+    return _cached_array("mask", mask, lambda m: np.asarray(m))
+
+
+def _hard_mask(mask: Image.Image) -> Optional[np.ndarray]:
+    """Boolean coverage if mask is strictly 0/255, else None"""
+    def build(m):
+        a = np.asarray(m)
+        return a == 255 if np.isin(a, (0, 255)).all() else np.array(False)
+    hard = _cached_array("hard", mask, build)
+    return hard if hard.ndim else None
+
+
+def _pixel(color) -> Tuple[int, int, int, int]:
+    return ImageColor.getcolor(color, "RGBA") if isinstance(color, str) else tuple(color)
+
+
+def _premultiplied_pixel(rgba) -> np.ndarray:
+    return _premultiply(np.array([[rgba]], dtype=np.uint8))[0, 0]
+
+
+def _div255(x: np.ndarray) -> np.ndarray:
+    x += 128
+    x += x >> 8
+    x >>= 8
+    return x
+
+
+class Canvas:
+    """Premultiplied RGBA canvas backed by a single uint8 array"""
+
+    def __init__(self, size, bg=None, base: Optional[Image.Image] = None):
+        self.size = size
+        if base is not None:
+            self.px = _premultiply(np.asarray(base.convert("RGBA")))
+        else:
+            self.px = np.empty((size[1], size[0], 4), dtype=np.uint8)
+        # The same memory seen as one uint32 per pixel, for fills and masked pixel copies
+        self.px32 = self.px.view(np.uint32)[..., 0]
+        if base is None:
+            self.fill(_pixel(bg))
+
+    def fill(self, rgba):
+        self.px32.fill(_premultiplied_pixel(rgba).view(np.uint32)[0])
+
+    def copy(self, rect, src: np.ndarray, where: np.ndarray):
+        """Replace pixels in rect where the boolean mask is set (src: premultiplied, opaque
+        pixel, or a (h, w) uint32 pixel view)"""
+        x0, y0, x1, y1 = rect
+        if src.ndim == 1:
+            src = src.view(np.uint32)[0]
+        np.copyto(self.px32[y0:y1, x0:x1], src, where=where)
+
+    def over(self, rect, src: np.ndarray, coverage: Optional[np.ndarray] = None):
+        """Premultiplied source-over of src (pixel or array) scaled by an optional 0..255 coverage"""
+        x0, y0, x1, y1 = rect
+        dst = self.px[y0:y1, x0:x1]
+        src = src.astype(np.uint16)
+        if coverage is not None:
+            src = _div255(src * coverage[..., None].astype(np.uint16))
+        if src.ndim == 1:
+            src = np.broadcast_to(src, dst.shape)
+        out = _div255(dst.astype(np.uint16) * (255 - src[..., 3:4]))
+        out += src
+        dst[...] = out
+
+    def to_image(self) -> Image.Image:
+        return Image.frombuffer("RGBa", self.size, self.px, "raw", "RGBa", 0, 1).convert("RGBA")
+
+
+def _blend_background(canvas: Canvas, layer: BackgroundLayer, rect):
+    if layer.mode == "solid":
+        # Drawn like ImageDraw.rectangle: the colour replaces the canvas
+        canvas.fill(_pixel(layer.color))
+    else:
+        grad = gradient_from_spec(canvas.size, layer.gradient)
+        canvas.over(rect, premultiplied(grad))
+
+
+def _blend_color(canvas: Canvas, rect, mask: Image.Image, color):
+    """Composite a solid colour through mask"""
+    src = _premultiplied_pixel(_pixel(color))
+    hard = _hard_mask(mask)
+    if hard is not None and src[3] == 255:
+        canvas.copy(rect, src, hard)
+    else:
+        canvas.over(rect, src, _mask_array(mask))
+
+
+def _blend_gradient(canvas: Canvas, rect, mask: Image.Image, grad: Image.Image):
+    """Composite the rect region of a canvas-sized gradient through mask"""
+    x0, y0, x1, y1 = rect
+    src = premultiplied(grad)
+    hard = _hard_mask(mask)
+    if hard is not None and _is_opaque(grad):
+        canvas.copy(rect, src.view(np.uint32)[y0:y1, x0:x1, 0], hard)
+    else:
+        canvas.over(rect, src[y0:y1, x0:x1], _mask_array(mask))
+
+
+def _blend_shape(canvas: Canvas, layer: ShapeLayer, rect):
+    cov = layer._coverage(canvas.size)
+    mode = layer.fill.get("mode", "solid")
+    if mode != "transparent":
+        mask = crop_to_rect(cov.fill, cov.rect, rect)
+        if mode == "solid":
+            _blend_color(canvas, rect, mask, layer.fill.get("color", "#FFFFFF"))
+        else:
+            _blend_gradient(canvas, rect, mask, gradient_from_spec(canvas.size, layer.fill))
+    if cov.border is not None:
+        _blend_color(canvas, rect, crop_to_rect(cov.border, cov.rect, rect), layer.border["color"])
+
+
+def _blend_image(canvas: Canvas, layer: ImageLayer, rect):
+    img = layer._image()
+    x0, y0, _, _ = layer.dirty_rect(canvas.size)
+    src = premultiplied(img)[rect[1]-y0:rect[3]-y0, rect[0]-x0:rect[2]-x0]
+    if layer.opacity < 1.0:
+        # Premultiplied, so opacity scales every channel
+        src = (src * layer.opacity).astype(np.uint8)
+    canvas.over(rect, src)
+
+
+def _blend_text(canvas: Canvas, layer: TextLayer, rect):
+    if layer.resolved_layout is None:
+        layer = layer.compile(canvas.size)
+    W, H = canvas.size
+    f, layout = layer.resolved_font, layer.resolved_layout
+    x, y = resolve_align(layer.align, layout.width, layout.height, W, H)
+    mask = Image.new("L", canvas.size, 0)
+    d = ImageDraw.Draw(mask)
+    for ln, line_width, dy in zip(layout.lines, layout.widths, layout.line_offsets()):
+        line_x = (W - line_width) // 2 if layer.align.get("x") == "center" else x
+        d.text((line_x, y + dy), ln, font=f, fill=255, anchor="lt")
+    box = mask.getbbox()
+    if box is None:
+        return
+    canvas.over(box, _premultiplied_pixel(_pixel(layer.color)), np.asarray(mask.crop(box)))
+
+
+_BLENDERS = {
+    BackgroundLayer: _blend_background,
+    ShapeLayer: _blend_shape,
+    ImageLayer: _blend_image,
+    LogoLayer: _blend_image,
+    TextLayer: _blend_text,
+}
+
+
+def _blend_generic(canvas: Canvas, layer, rect):
+    """Layers without a NumPy path: composite their tile, or let them draw on a PIL copy"""
+    tile = layer.render_tile(canvas.size, rect)
+    if tile is not None:
+        canvas.over(rect, _premultiply(np.asarray(tile.convert("RGBA"))))
+        return
+    image = canvas.to_image()
+    layer.render(image)
+    canvas.px[...] = _premultiply(np.asarray(image))
+
+
+def render_plan(plan, base: Optional[Image.Image] = None, timings: Optional[Timings] = None) -> Image.Image:
+    """
+    Render a RenderPlan with the NumPy backend
+
+    Args:
+        plan: Compiled RenderPlan
+        base: Optional image to draw onto instead of a fresh canvas
+        timings: Optional Timings to add each layer's draw time to
+
+    Returns:
+        Rendered RGBA image
+    """
+    canvas = Canvas(plan.size, plan.bg, base)
+    for step in plan.steps:
+        start = time.perf_counter() if timings is not None else 0.0
+        blend = _BLENDERS.get(type(step.layer), _blend_generic)
+        blend(canvas, step.layer, step.rect)
+        if timings is not None:
+            timings.add_layer(step.index, step.layer, time.perf_counter() - start)
+    return canvas.to_image()
@@ -0,0 +1,227 @@
+"""
+Render executor - runs badge rendering off the event loop
+
+Rendering and PNG encoding are CPU bound, so they run in a process pool
+(or a thread pool) instead of blocking the uvicorn worker's event loop.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.composer import render_from_spec
+from app.core.encoder import EncodedImage, EncodeOptions, encode_image
+from app.core.logging_config import get_logger
+from app.core.timing import Timings
+from app.settings import settings
+
+logger = get_logger("render_executor")
+
+
+class RenderQueueFullError(RuntimeError):
+    """Raised when more renders are pending than the executor accepts"""
+
+
+def render_badge_image(spec: Dict[str, Any], options: EncodeOptions, timed: bool = False) -> EncodedImage:
+    """
+    Render a badge spec and encode it (runs inside a worker)
+
+    Args:
+        spec: Badge specification accepted by render_from_spec
+        options: Output format and compression options
+        timed: Record parse, per-layer, render and encode spans in the result's timings
+
+    Returns:
+        EncodedImage with the image bytes and encode time
+    """
+    timings = Timings() if timed else None
+    image = render_from_spec(spec, timings)
+    if image is None:
+        raise ValueError("Failed to generate badge image")
+
+    encoded = encode_image(image, options)
+    if timings is not None:
+        timings.add("encode", encoded.encode_seconds)
+        encoded.timings = timings
+    return encoded
+
+
+def render_badge_images(specs: List[Dict[str, Any]], options: List[EncodeOptions]) -> List[EncodedImage]:
+    """
+    Render several related specs in one worker so they share its font, image,
+    shape and text layout caches
+
+    Args:
+        specs: Badge specifications accepted by render_from_spec
+        options: Encode options for each spec
+
+    Returns:
+        EncodedImage per spec, in order
+    """
+    return [render_badge_image(spec, opts) for spec, opts in zip(specs, options)]
+
+
+class RenderExecutor:
+    """Bounded process/thread pool for render jobs"""
+
+    def __init__(self, kind: str = "process", workers: int = 0,
+                 max_queue: int = 64, max_pool_tasks: int = 0):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown render executor: {kind}")
+        self.kind = kind
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.max_queue = max(0, max_queue)
+        self.max_pool_tasks = max(0, max_pool_tasks)
+        self._pool: Optional[Executor] = None
+        self._pool_tasks = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._start_gate: Optional[asyncio.Event] = None
+        self._started = False
+
+    @classmethod
+    def from_settings(cls) -> "RenderExecutor":
+        return cls(
+            kind=settings.RENDER_EXECUTOR,
+            workers=settings.RENDER_WORKERS,
+            max_queue=settings.RENDER_MAX_QUEUE,
+            max_pool_tasks=settings.RENDER_POOL_MAX_TASKS,
+        )
+
+    @property
+    def started(self) -> bool:
+        """Whether start() has run; stays true while a broken pool waits to be recreated"""
+        return self._started
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of renders running or waiting at once"""
+        return self.workers + self.max_queue
+
+    def _new_pool(self) -> Executor:
+        """
+        Create a render pool
+
+        Process workers are always forked so they inherit the preloaded fonts,
+        images and registered templates; newer Pythons default to forkserver,
+        which would start each worker from a cold interpreter.
+        """
+        if self.kind == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("fork"))
+
+    def _acquire_pool(self) -> Executor:
+        """
+        Return the current pool, replacing it once it has run max_pool_tasks renders
+
+        Recycling is pool-wide: the budget counts renders across all workers and
+        the whole pool is replaced, so a busy worker can run more than its share
+        first. ProcessPoolExecutor's per-child max_tasks_per_child needs Python
+        3.11 and a non-fork start method, and forked workers are what inherit
+        the preloaded assets.
+        """
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise RenderQueueFullError(
+                    f"Render queue is full ({self._pending} pending, capacity {self.capacity})"
+                )
+            self._pending += 1
+
+            if (self._pool is not None and self.kind == "process"
+                    and self.max_pool_tasks and self._pool_tasks >= self.max_pool_tasks):
+                logger.info(f"Recycling render workers after {self._pool_tasks} tasks")
+                # In-flight renders finish on the old pool before its workers exit
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+            if self._pool is None:
+                self._pool = self._new_pool()
+                self._pool_tasks = 0
+            self._pool_tasks += 1
+            return self._pool
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def defer_start(self):
+        """
+        Hold renders until start() is called
+
+        The API calls this at startup so requests that arrive during the warm-up
+        wait for the warm pool instead of lazily forking workers from a cold
+        process. Without it, the first render creates the pool.
+        """
+        self._start_gate = asyncio.Event()
+
+    def start(self):
+        """Create the worker pool ahead of the first request"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._new_pool()
+                self._pool_tasks = 0
+                if self.kind == "process":
+                    # Worker processes are forked on demand; fork them all now instead
+                    # of on the first requests
+                    for future in [self._pool.submit(os.getpid) for _ in range(self.workers)]:
+                        future.result()
+        self._started = True
+        if self._start_gate is not None:
+            self._start_gate.set()
+        logger.info(f"Render executor started: {self.kind} pool with {self.workers} workers, "
+                    f"max queue {self.max_queue}")
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._started = False
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+        }
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Run fn(*args) on the pool and await its result
+
+        Raises:
+            RenderQueueFullError: If the executor is already at capacity
+        """
+        if self._start_gate is not None and not self._start_gate.is_set():
+            await self._start_gate.wait()
+        pool = self._acquire_pool()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM killed); start fresh for the next request
+            logger.error("Render process pool is broken, recreating it")
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise
+        finally:
+            self._release()
+
+    async def render_image(self, spec: Dict[str, Any], options: EncodeOptions,
+                           timed: bool = False) -> EncodedImage:
+        """Render and encode a badge spec on the pool (timed: see render_badge_image)"""
+        return await self.run(render_badge_image, spec, options, timed)
+
+    async def render_images(self, specs: List[Dict[str, Any]],
+                            options: List[EncodeOptions]) -> List[EncodedImage]:
+        """Render and encode a group of specs as a single job on the pool"""
+        return await self.run(render_badge_images, specs, options)
+
+
+render_executor = RenderExecutor.from_settings()
@@ -0,0 +1,167 @@
+"""
+Badge templates - specs with named {{placeholders}} and pre-rendered base plates
+
+Layers that don't reference a placeholder render the same for every set of
+values, so the ones below the first variable layer are composited once into a
+"base plate". Rendering a template then only draws the variable layers (and
+anything stacked above them) onto a copy of the plate.
+"""
+
+import copy
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
+
+from PIL import Image
+
+from app.core.composer import build_composer, compile_spec
+from app.core.encoder import EncodedImage, EncodeOptions, encode_image
+from app.core.layers.image import LogoLayer
+from app.core.layers.shape import ShapeLayer
+from app.core.layers.text import TextLayer
+from app.core.utils.cache import LRUCache
+from app.settings import settings
+
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+# Base plates per template id; each render worker builds its own on first use
+plate_cache = LRUCache("template_plates", max_bytes=settings.TEMPLATE_PLATE_CACHE_MAX_BYTES)
+
+
+def find_placeholders(value: Any) -> Set[str]:
+    """Names of all {{placeholders}} in a (nested) spec value"""
+    if isinstance(value, str):
+        return set(PLACEHOLDER.findall(value))
+    if isinstance(value, dict):
+        return set().union(*(find_placeholders(v) for v in value.values()))
+    if isinstance(value, (list, tuple)):
+        return set().union(*(find_placeholders(v) for v in value))
+    return set()
+
+
+def substitute(value: Any, values: Dict[str, str]) -> Any:
+    """Copy of a (nested) spec value with {{placeholders}} replaced from values"""
+    if isinstance(value, str):
+        return PLACEHOLDER.sub(lambda m: str(values[m.group(1)]), value)
+    if isinstance(value, dict):
+        return {k: substitute(v, values) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [substitute(v, values) for v in value]
+    return value
+
+
+def _variable_layers(spec: Dict[str, Any]) -> Set[int]:
+    """Indices of layers whose output can change with the placeholder values"""
+    layer_specs = spec.get("layers", [])
+    variable = {i for i, layer in enumerate(layer_specs) if find_placeholders(layer)}
+
+    # Dynamic positions derive from the main shape and the logo, so if either of
+    # those varies, every dynamically placed layer varies with it
+    layers = build_composer(spec).layers
+    drivers = [next((i for i, L in enumerate(layers) if isinstance(L, cls)), None)
+               for cls in (ShapeLayer, LogoLayer)]
+    if any(i in variable for i in drivers if i is not None):
+        for i, layer in enumerate(layers):
+            if isinstance(layer, LogoLayer) and layer.pos.get("y") == "dynamic":
+                variable.add(i)
+            elif isinstance(layer, TextLayer) and (
+                    layer.align.get("y") == "dynamic" or layer.wrap.get("dynamic", False)):
+                variable.add(i)
+    return variable
+
+
+def _plate_layers(spec: Dict[str, Any], variable: Set[int]) -> FrozenSet[int]:
+    """Static layers stacked below every variable layer (same z order as the Composer)"""
+    order = sorted(range(len(spec.get("layers", []))), key=lambda i: int(spec["layers"][i].get("z", 0)))
+    plate = []
+    for i in order:
+        if i in variable:
+            break
+        plate.append(i)
+    return frozenset(plate)
+
+
+@dataclass(frozen=True)
+class Template:
+    """A registered badge spec with placeholders"""
+    id: str
+    spec: Dict[str, Any]
+    placeholders: Tuple[str, ...]
+    defaults: Dict[str, str]
+    plate_layers: FrozenSet[int]
+
+    @classmethod
+    def create(cls, spec: Dict[str, Any], defaults: Optional[Dict[str, str]] = None) -> "Template":
+        """
+        Analyse a spec into a Template; the id is a content hash, so registering
+        the same spec and defaults twice gives the same template
+
+        Raises:
+            ValueError: If the spec is invalid, has placeholders outside its layers
+                or a default names an unknown placeholder
+        """
+        defaults = dict(defaults or {})
+        outside = find_placeholders({k: v for k, v in spec.items() if k != "layers"})
+        if outside:
+            raise ValueError(f"Placeholders are only allowed in layers: {', '.join(sorted(outside))}")
+        placeholders = find_placeholders(spec.get("layers", []))
+        unknown = set(defaults) - placeholders
+        if unknown:
+            raise ValueError(f"Defaults for unknown placeholders: {', '.join(sorted(unknown))}")
+        if find_placeholders([{k: v for k, v in layer.items() if k in ("type", "z")}
+                              for layer in spec.get("layers", [])]):
+            raise ValueError("Layer type and z cannot be placeholders")
+
+        canonical = json.dumps({"spec": spec, "defaults": defaults}, sort_keys=True,
+                               separators=(",", ":"), default=str)
+        return cls(
+            id=hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16],
+            spec=copy.deepcopy(spec),
+            placeholders=tuple(sorted(placeholders)),
+            defaults=defaults,
+            plate_layers=_plate_layers(spec, _variable_layers(spec)),
+        )
+
+    def resolve(self, values: Dict[str, str]) -> Dict[str, Any]:
+        """
+        The template's spec with placeholders filled from values, then defaults
+
+        Raises:
+            ValueError: If a placeholder has no value or values names an unknown placeholder
+        """
+        unknown = set(values) - set(self.placeholders)
+        if unknown:
+            raise ValueError(f"Unknown placeholders: {', '.join(sorted(unknown))}")
+        merged = {**self.defaults, **values}
+        missing = [name for name in self.placeholders if name not in merged]
+        if missing:
+            raise ValueError(f"Missing values for placeholders: {', '.join(missing)}")
+        return substitute(self.spec, merged)
+
+
+def _plate_sizeof(image: Image.Image) -> int:
+    return image.width * image.height * 4
+
+
+def render_template_image(template_id: str, plate_layers: FrozenSet[int],
+                          spec: Dict[str, Any], options: EncodeOptions) -> EncodedImage:
+    """
+    Render a resolved template spec onto its cached base plate and encode it
+    (runs inside a render worker)
+
+    Args:
+        template_id: Template the spec was resolved from (plate cache key)
+        plate_layers: Indices of the layers baked into the base plate
+        spec: Template spec with placeholders substituted
+        options: Output format and compression options
+
+    Returns:
+        EncodedImage with the image bytes and encode time
+    """
+    plate = plate_cache.get_or_create(
+        template_id, lambda: compile_spec(spec, plate_layers).render(), _plate_sizeof)
+    rest = set(range(len(spec.get("layers", [])))) - plate_layers
+    image = compile_spec(spec, rest).render(base=plate)
+    return encode_image(image, options)
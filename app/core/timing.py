@@ -0,0 +1,93 @@
+"""
+Render timing spans
+
+A Timings object collects named durations while one badge is generated:
+config generation, spec parse, each layer (compile plus draw), encode and the
+base64 data URI. The spans are sent back in a Server-Timing header and in the
+debug field of BadgeResponse.
+
+Timing is off unless RENDER_TIMING_ENABLED is set. Instrumented code takes
+an optional Timings and skips all bookkeeping when it is None.
+"""
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.settings import settings
+
+
+@dataclass
+class Span:
+    name: str
+    seconds: float = 0.0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def describe(self) -> str:
+        return " ".join(f"{key}={value}" for key, value in self.attrs.items())
+
+
+class Timings:
+    """Ordered spans for one badge; adding to an existing name accumulates into it"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._by_name: Dict[str, Span] = {}
+
+    def add(self, name: str, seconds: float, **attrs) -> Span:
+        span = self._by_name.get(name)
+        if span is None:
+            span = self._by_name[name] = Span(name, 0.0, attrs)
+            self.spans.append(span)
+        span.seconds += seconds
+        return span
+
+    def add_layer(self, index: int, layer: Any, seconds: float):
+        """Time spent on the layer at position index in z order (compile and draw add up)"""
+        self.add(f"layer{index}", seconds, type=type(layer).__name__, z=layer.z)
+
+    def extend(self, spans: List[Span]):
+        for span in spans:
+            self.add(span.name, span.seconds, **span.attrs)
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, **attrs)
+
+    def seconds(self, name: str) -> float:
+        span = self._by_name.get(name)
+        return span.seconds if span else 0.0
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        metrics = []
+        for span in self.spans:
+            metric = f"{span.name};dur={span.seconds * 1000:.2f}"
+            if span.attrs:
+                metric += f';desc="{span.describe()}"'
+            metrics.append(metric)
+        return ", ".join(metrics)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [{"name": span.name, "duration_ms": round(span.seconds * 1000, 3), **span.attrs}
+                for span in self.spans]
+
+
+def new_timings() -> Optional[Timings]:
+    """A Timings for one request, or None when render timing is disabled"""
+    return Timings() if settings.RENDER_TIMING_ENABLED else None
+
+
+@contextmanager
+def timed(timings: Optional[Timings], name: str, **attrs) -> Iterator[None]:
+    """Span context manager that does nothing when timings is None"""
+    if timings is None:
+        yield
+        return
+    with timings.span(name, **attrs):
+        yield
@@ -0,0 +1,253 @@
+"""
+Normalized asset store - images pre-decoded to straight RGBA by `python -m app.assets build`
+
+Source assets come in whatever format they were saved in (WebP and JPEG
+files named .png, grey+alpha PNGs, ...). The store keeps each image as raw
+RGBA pixels at its original size and at the sizes dynamic image layers draw
+it at, together with the font files, in one data file, plus a manifest of
+dimensions, offsets and content hashes:
+
+    <store>/manifest.json
+    <store>/assets.bin
+
+Every process maps assets.bin read-only and serves images as Image.frombuffer
+views over the mapped pages. Worker processes share those pages through the OS
+page cache, so an extra worker adds next to no resident memory for assets.
+
+Entries whose source file no longer matches its hash are ignored, so a stale
+store falls back to decoding the originals.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from PIL import Image
+from PIL.Image import Resampling
+
+from app.core.logging_config import get_logger
+from app.core.utils.geometry import fit_size
+from app.core.utils.paths import PROJECT_ROOT, resolve_asset_path
+from app.settings import settings
+
+logger = get_logger("asset_store")
+
+MANIFEST = "manifest.json"
+DATA_FILE = "assets.bin"
+STORE_VERSION = 2
+ALIGNMENT = 64  # every chunk starts on a cache line
+LEGACY_SUFFIX = ".rgba"  # per-variant pixel files of the version 1 layout
+
+Size = Tuple[int, int]
+
+
+def _sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _size_key(size: Size) -> str:
+    return f"{int(size[0])}x{int(size[1])}"
+
+
+class _DataWriter:
+    """Appends aligned chunks to the data file and returns their [offset, length]"""
+
+    def __init__(self, f):
+        self.f = f
+        self.offset = 0
+
+    def write(self, data: bytes):
+        padding = -self.offset % ALIGNMENT
+        self.f.write(b"\0" * padding)
+        self.offset += padding
+        chunk = [self.offset, len(data)]
+        self.f.write(data)
+        self.offset += len(data)
+        return chunk
+
+
+def build_store(store_dir: str, images: Dict[str, Iterable[Size]],
+                fonts: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Decode source images and write them, with the font files, to store_dir
+
+    The data file is written next to the old one and moved into place, so
+    processes that already mapped the old store keep reading it until restarted.
+
+    Args:
+        store_dir: Absolute store directory (created if missing)
+        images: Image path relative to the project root -> boxes to pre-scale it into
+            (aspect ratio kept, LANCZOS, like ImageLayer's dynamic sizing)
+        fonts: Font paths relative to the project root
+
+    Returns:
+        The manifest that was written
+
+    Raises:
+        ValueError: If store_dir holds files but no store manifest
+    """
+    if os.path.isdir(store_dir) and os.listdir(store_dir) and not os.path.isfile(os.path.join(store_dir, MANIFEST)):
+        raise ValueError(f"{store_dir} is not empty and is not an asset store; "
+                         f"point ASSET_STORE_DIR at an empty or dedicated directory")
+    os.makedirs(store_dir, exist_ok=True)
+    data_path = os.path.join(store_dir, DATA_FILE)
+    assets, font_entries = {}, {}
+    with open(data_path + ".tmp", "wb") as f:
+        writer = _DataWriter(f)
+        for rel_path, boxes in sorted(images.items()):
+            path = resolve_asset_path(rel_path)
+            with Image.open(path) as img:
+                source_format, source_mode = img.format, img.mode
+                original = img.convert("RGBA")
+
+            variants = {}
+            for size in [original.size] + [fit_size(original.size, box) for box in boxes]:
+                key = _size_key(size)
+                if key not in variants:
+                    scaled = original if size == original.size else original.resize(size, Resampling.LANCZOS)
+                    variants[key] = writer.write(scaled.tobytes())
+
+            assets[rel_path] = {
+                "sha256": _sha256(path),
+                "format": source_format,
+                "mode": source_mode,
+                "size": list(original.size),
+                "variants": variants,
+            }
+
+        for rel_path in sorted(fonts):
+            path = resolve_asset_path(rel_path)
+            with open(path, "rb") as font_file:
+                data = font_file.read()
+            font_entries[rel_path] = {"sha256": hashlib.sha256(data).hexdigest(), "data": writer.write(data)}
+    os.replace(data_path + ".tmp", data_path)
+
+    manifest = {"version": STORE_VERSION, "assets": assets, "fonts": font_entries}
+    with open(os.path.join(store_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    # Drop pixel files left over from the version 1 layout; anything else is left alone
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        if name.endswith(LEGACY_SUFFIX) and os.path.isfile(path):
+            os.remove(path)
+    return manifest
+
+
+class AssetStore:
+    def __init__(self, store_dir: str, enabled: bool = True):
+        self.store_dir = store_dir
+        self.enabled = enabled
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None  # absolute source path -> entry
+        self._fonts: Dict[str, Dict[str, Any]] = {}
+        self._view: Optional[memoryview] = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def open(self) -> int:
+        """
+        Map the data file and check every manifest entry against its source file
+        (done once per process; forked workers inherit the mapping)
+
+        Returns:
+            Number of usable image entries
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._map() if self.enabled else {}
+            return len(self._entries)
+
+    def _map(self) -> Dict[str, Dict[str, Any]]:
+        manifest_path = os.path.join(self.store_dir, MANIFEST)
+        if not os.path.exists(manifest_path):
+            logger.info(f"No asset store at {self.store_dir}; decoding original assets "
+                        f"(run `python -m app.assets build` to create one)")
+            return {}
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != STORE_VERSION:
+            logger.warning(f"Asset store version {manifest.get('version')} is not {STORE_VERSION}; "
+                           f"ignoring it (rebuild with `python -m app.assets build`)")
+            return {}
+
+        entries, fonts, stale = {}, {}, []
+        for section, usable in (("assets", entries), ("fonts", fonts)):
+            for rel_path, entry in manifest.get(section, {}).items():
+                path = os.path.join(PROJECT_ROOT, rel_path)
+                if os.path.exists(path) and _sha256(path) == entry["sha256"]:
+                    usable[path] = entry
+                else:
+                    stale.append(rel_path)
+        if stale:
+            logger.warning(f"Ignoring {len(stale)} stale asset store entries: {', '.join(sorted(stale))}")
+
+        with open(os.path.join(self.store_dir, DATA_FILE), "rb") as f:
+            # The mapping stays valid after the file is closed
+            self._view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        self._fonts = fonts
+        logger.info(f"Asset store: mapped {len(entries)} images and {len(fonts)} fonts "
+                    f"({len(self._view) / (1024 * 1024):.1f} MB) from {self.store_dir}")
+        return entries
+
+    def _entry(self, path: str) -> Optional[Dict[str, Any]]:
+        if self._entries is None:
+            self.open()
+        return self._entries.get(path)
+
+    def _chunk(self, chunk) -> memoryview:
+        offset, length = chunk
+        return self._view[offset:offset + length]
+
+    def original_size(self, path: str) -> Optional[Size]:
+        """Size of the source image, or None if it isn't in the store"""
+        entry = self._entry(path)
+        return tuple(entry["size"]) if entry else None
+
+    def load(self, path: str, size: Optional[Size] = None) -> Optional[Image.Image]:
+        """
+        Stored RGBA pixels of an image
+
+        Args:
+            path: Absolute source path
+            size: Pre-scaled (width, height), or None for the original size
+
+        Returns:
+            A read-only image over the mapped pages (shared; copy before
+            changing it), or None if the store doesn't have it at that size
+        """
+        entry = self._entry(path)
+        if entry is None:
+            return None
+        size = tuple(entry["size"]) if size is None else (int(size[0]), int(size[1]))
+        chunk = entry["variants"].get(_size_key(size))
+        if chunk is None:
+            return None
+        self.loads += 1
+        return Image.frombuffer("RGBA", size, self._chunk(chunk), "raw", "RGBA", 0, 1)
+
+    def font_bytes(self, path: str) -> Optional[bytes]:
+        """
+        Contents of a stored font file, or None if it isn't in the store
+
+        FreeType faces need a bytes object, so this is a copy of the mapped pages.
+        """
+        if self._entries is None:
+            self.open()
+        entry = self._fonts.get(path)
+        return bytes(self._chunk(entry["data"])) if entry else None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "assets": len(self._entries or {}),
+            "variants": sum(len(e["variants"]) for e in (self._entries or {}).values()),
+            "fonts": len(self._fonts),
+            "mapped_bytes": len(self._view) if self._view is not None else 0,
+            "loads": self.loads,
+        }
+
+
+asset_store = AssetStore(resolve_asset_path(settings.ASSET_STORE_DIR), settings.ASSET_STORE_ENABLED)
@@ -0,0 +1,132 @@
+"""Thread-safe LRU cache bounded by entry count and/or byte size"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Every cache created in the process, by name, so their counters can be reported
+CACHES: Dict[str, "LRUCache"] = {}
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, name: str, max_bytes: int = 0, max_entries: int = 0,
+                 ttl: Optional[float] = None):
+        """
+        Args:
+            name: Name the cache is reported under
+            max_bytes: Byte budget across all entries (0 = unbounded)
+            max_entries: Maximum number of entries (0 = unbounded)
+            ttl: Seconds after which an entry expires (None = never)
+        """
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, size, expires)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        CACHES[name] = self
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def fill_level(self) -> Optional[float]:
+        """Fraction of the byte (or entry) budget in use; None if unbounded"""
+        if self.max_bytes:
+            return self._bytes / self.max_bytes
+        if self.max_entries:
+            return len(self._data) / self.max_entries
+        return None
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int = 0):
+        """Store value, evicting least recently used entries to stay within budget"""
+        if self.max_bytes and size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires)
+            self._bytes += size
+            while self._data and ((self.max_bytes and self._bytes > self.max_bytes)
+                                  or (self.max_entries and len(self._data) > self.max_entries)):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any],
+                      sizeof: Callable[[Any], int] = lambda v: 0) -> Any:
+        """Return the cached value for key, building and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value, sizeof(value))
+        return value
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters for every cache in this process"""
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+def cache_fill_levels() -> Dict[str, Dict[str, Any]]:
+    """Entries and budget fill level for every cache in this process"""
+    return {
+        name: {
+            "entries": len(cache),
+            "fill": round(cache.fill_level, 4) if cache.fill_level is not None else None,
+        }
+        for name, cache in CACHES.items()
+    }
@@ -0,0 +1,110 @@
+"""Font registry - loads font files once and memoizes FreeType faces per (path, size)"""
+
+import os
+import threading
+from typing import Dict, Iterable
+
+from PIL import ImageFont
+
+from app.core.logging_config import get_logger
+from app.core.utils.asset_store import asset_store
+from app.core.utils.cache import LRUCache
+from app.core.utils.paths import resolve_asset_path
+from app.settings import settings
+
+logger = get_logger("fonts")
+
+DEFAULT_FONT_PATH = "assets/fonts/Arial.ttf"
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+
+class FontError(ValueError):
+    """Raised when a font cannot be found or parsed"""
+
+
+class _SharedBytes:
+    """File-like wrapper so every face of a font shares one bytes object"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def read(self, *args) -> bytes:
+        return self.data
+
+
+class FontRegistry:
+    def __init__(self, max_faces: int = 64):
+        self._files: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._faces = LRUCache("fonts", max_entries=max_faces)
+
+    def font_bytes(self, path: str) -> bytes:
+        """Raw bytes of a font file, read from the asset store or disk once per process"""
+        full_path = resolve_asset_path(path)
+        data = self._files.get(full_path)
+        if data is None:
+            data = asset_store.font_bytes(full_path)
+            if data is None:
+                try:
+                    with open(full_path, "rb") as f:
+                        data = f.read()
+                except OSError as e:
+                    raise FontError(f"Font not found: {path}") from e
+            with self._lock:
+                data = self._files.setdefault(full_path, data)
+        return data
+
+    def get(self, path: str, size: int) -> ImageFont.FreeTypeFont:
+        """
+        Get a FreeType face for a font file at a pixel size
+
+        Args:
+            path: Font path, relative to the project root or absolute
+            size: Font size in pixels
+
+        Returns:
+            Shared FreeTypeFont instance
+
+        Raises:
+            FontError: If the font file is missing or not a valid font
+        """
+        path = path or DEFAULT_FONT_PATH
+        size = int(size)
+        key = (resolve_asset_path(path), size)
+        font = self._faces.get(key)
+        if font is None:
+            data = self.font_bytes(path)
+            try:
+                font = ImageFont.truetype(_SharedBytes(data), size)
+            except OSError as e:
+                raise FontError(f"Invalid font file {path}: {e}") from e
+            self._faces.put(key, font)
+        return font
+
+    def preload(self, font_dir: str = "assets/fonts", sizes: Iterable[int] = ()) -> int:
+        """
+        Read every font in font_dir into memory and build faces for the given sizes
+
+        Returns:
+            Number of font files loaded
+        """
+        full_dir = resolve_asset_path(font_dir)
+        names = sorted(n for n in os.listdir(full_dir) if n.lower().endswith(FONT_EXTENSIONS))
+        sizes = list(sizes)
+        for name in names:
+            path = os.path.join(full_dir, name)
+            self.font_bytes(path)
+            for size in sizes:
+                self.get(path, size)
+        logger.info(f"Preloaded {len(names)} fonts from {font_dir} at {len(sizes)} sizes")
+        return len(names)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "files": len(self._files),
+            "file_bytes": sum(len(b) for b in self._files.values()),
+            **self._faces.stats(),
+        }
+
+
+font_registry = FontRegistry(max_faces=settings.FONT_CACHE_MAX_FACES)
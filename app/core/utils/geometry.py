@@ -1,134 +1,63 @@
-import math
+from app.core.utils.shapes import SHAPES, shape_spans
 
 
-def get_shape_width_at_y(shape_spec, y_position, canvas_width, canvas_height):
-    """Calculate the horizontal width of a shape at a given Y position"""
-    shape = shape_spec.get("shape", "hexagon")
-    params = shape_spec.get("params", {})
-    cx = canvas_width // 2
-    cy = canvas_height // 2
-    
-    if shape == "hexagon":
-        radius = int(params.get("radius", min(canvas_width, canvas_height)//2 - 20))
-        # Hexagon with flat sides has vertices at 60-degree intervals
-        # Calculate the X bounds at the given Y position
-        ang = math.pi/3  # 60 degrees
-        points = [(cx + radius*math.cos(i*ang), cy + radius*math.sin(i*ang)) for i in range(6)]
-        
-        # Find the hexagon edges that intersect with the horizontal line at y_position
-        # The hexagon has 6 edges, we need to find which ones cross our Y line
-        left_x = canvas_width
-        right_x = 0
-        
-        for i in range(6):
-            p1 = points[i]
-            p2 = points[(i + 1) % 6]
-            
-            # Check if this edge crosses the Y position
-            if (p1[1] <= y_position <= p2[1]) or (p2[1] <= y_position <= p1[1]):
-                # Calculate X at this Y using linear interpolation
-                if p2[1] != p1[1]:  # Avoid division by zero
-                    t = (y_position - p1[1]) / (p2[1] - p1[1])
-                    x = p1[0] + t * (p2[0] - p1[0])
-                    left_x = min(left_x, x)
-                    right_x = max(right_x, x)
-        
-        if left_x < canvas_width and right_x > 0:
-            return left_x, right_x
-        return cx - radius, cx + radius  # Fallback to full width
-    
-    elif shape == "circle":
-        margin = int(params.get("margin", 50))
-        radius = min(canvas_width, canvas_height)//2 - margin
-        
-        # Calculate circle intersection at Y
-        dy = abs(y_position - cy)
-        if dy <= radius:
-            # Use Pythagorean theorem to find X extent at this Y
-            dx = math.sqrt(radius**2 - dy**2)
-            return cx - dx, cx + dx
-        return cx, cx  # Outside circle, no width
-    
-    elif shape == "shield":
-        margin = int(params.get("margin", 56))
-        left = margin
-        right = canvas_width - margin
-        return left, right  # Shield has straight sides in our implementation
-    
-    elif shape == "rounded_rect":
-        # Match ShapeLayer implementation - use width, height, radius parameters
-        width = int(params.get("width", 450))
-        height = int(params.get("height", 450))
+def clip_rect(rect, size):
+    """Clip a box (x0, y0, x1, y1) to a canvas of size (W, H); None if nothing is left"""
+    if rect is None:
+        return None
+    x0, y0 = max(0, int(rect[0])), max(0, int(rect[1]))
+    x1, y1 = min(size[0], int(rect[2])), min(size[1], int(rect[3]))
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1, y1)
 
-        # Center the rectangle on canvas (same as ShapeLayer)
-        x1 = cx - width//2
-        y1 = cy - height//2
-        x2 = cx + width//2
-        y2 = cy + height//2
 
-        rect = [x1, y1, x2, y2]
-        if rect[1] <= y_position <= rect[3]:
-            return rect[0], rect[2]
-        return cx, cx  # Outside rectangle
-    
-    # Default: use full width minus margin
-    margin = 50
-    return margin, canvas_width - margin
+def crop_to_rect(image, image_rect, rect):
+    """Crop an image covering the canvas box image_rect down to the box rect (which lies inside it)"""
+    if rect == image_rect:
+        return image
+    ox, oy = image_rect[0], image_rect[1]
+    return image.crop((rect[0]-ox, rect[1]-oy, rect[2]-ox, rect[3]-oy))
 
 
-def get_shape_bounds(shape_spec, canvas_width, canvas_height):
-    """Calculate the bounding box of a shape layer"""
+def _spans(shape_spec, canvas_width, canvas_height):
+    """Span table for shapes ShapeLayer can draw, None for anything else"""
     shape = shape_spec.get("shape", "hexagon")
-    params = shape_spec.get("params", {})
-    
-    if shape == "hexagon":
-        radius = int(params.get("radius", min(canvas_width, canvas_height)//2 - 20))
-        cx, cy = canvas_width//2, canvas_height//2
-        # Calculate actual hexagon points to get real Y bounds
-        # Hexagon with flat top/bottom has points at angles 0°, 60°, 120°, 180°, 240°, 300°
-        ang = math.pi/3  # 60 degrees
-        points = [(cx + radius*math.cos(i*ang), cy + radius*math.sin(i*ang)) for i in range(6)]
-        
-        # Get actual Y coordinates from the points
-        y_coords = [p[1] for p in points]
-        top = min(y_coords)     # Actual top Y of hexagon
-        bottom = max(y_coords)  # Actual bottom Y of hexagon
-        
-        return {"top": top, "bottom": bottom, "center_x": cx, "center_y": cy, "radius": radius}
-    
-    elif shape == "circle":
-        margin = int(params.get("margin", 50))
-        radius = min(canvas_width, canvas_height)//2 - margin
-        cx, cy = canvas_width//2, canvas_height//2
-        # Calculate actual circle bounds (just like we do for hexagon)
-        top = cy - radius      # Actual top Y of circle
-        bottom = cy + radius   # Actual bottom Y of circle
-        return {"top": top, "bottom": bottom, "center_x": cx, "center_y": cy, "radius": radius}
-    
-    elif shape == "shield":
-        margin = int(params.get("margin", 56))
-        tip_height = int(params.get("tip_height", 110))
-        top = margin
-        bottom = canvas_height - margin
-        cx = canvas_width//2
-        return {"top": top, "bottom": bottom, "center_x": cx, "center_y": (top + bottom)//2, "radius": min(canvas_width, canvas_height)//2 - margin}
-    
-    elif shape == "rounded_rect":
-        # Match ShapeLayer implementation - use width, height, radius parameters
-        width = int(params.get("width", 450))
-        height = int(params.get("height", 450))
+    if shape not in SHAPES:
+        return None
+    return shape_spans(shape, shape_spec.get("params", {}), (int(canvas_width), int(canvas_height)))
 
-        # Center the rectangle on canvas (same as ShapeLayer)
-        cx = canvas_width//2
-        cy = canvas_height//2
-        x1 = cx - width//2
-        y1 = cy - height//2
-        x2 = cx + width//2
-        y2 = cy + height//2
 
-        rect = [x1, y1, x2, y2]
-        top, bottom = rect[1], rect[3]
-        return {"top": top, "bottom": bottom, "center_x": cx, "center_y": cy, "radius": min(width, height)//2}
-    
-    # Default fallback
-    return {"top": 50, "bottom": canvas_height-50, "center_x": canvas_width//2, "center_y": canvas_height//2, "radius": min(canvas_width, canvas_height)//2 - 50}
\ No newline at end of file
+def get_shape_width_at_y(shape_spec, y_position, canvas_width, canvas_height):
+    """Left and right x of a shape's row at a given Y position (equal if the row is empty)"""
+    spans = _spans(shape_spec, canvas_width, canvas_height)
+    if spans is None:
+        # Default: use full width minus margin
+        margin = 50
+        return margin, canvas_width - margin
+    return spans.at(y_position)
+
+
+def get_shape_bounds(shape_spec, canvas_width, canvas_height):
+    """Calculate the bounding box of a shape layer from its span table"""
+    spans = _spans(shape_spec, canvas_width, canvas_height)
+    if spans is None or spans.bottom <= spans.top:
+        # Default fallback
+        return {"top": 50, "bottom": canvas_height-50, "center_x": canvas_width//2, "center_y": canvas_height//2, "radius": min(canvas_width, canvas_height)//2 - 50}
+    
+    return {
+        "top": spans.top,
+        "bottom": spans.bottom,
+        "center_x": (spans.x0 + spans.x1) // 2,
+        "center_y": (spans.top + spans.bottom) // 2,
+        "radius": max(spans.x1 - spans.x0, spans.bottom - spans.top) // 2,  # half the larger extent
+    }
+
+
+def fit_size(original_size, max_size, max_upscale=2.0):
+    """Largest (w, h) with original_size's aspect ratio inside max_size, upscaling at most max_upscale"""
+    (ow, oh), (max_width, max_height) = original_size, max_size
+    ratio = min(max_width / ow, max_height / oh)
+    if ratio > 1.0:
+        ratio = min(ratio, max_upscale)
+    return int(ow * ratio), int(oh * ratio)
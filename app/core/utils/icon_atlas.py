@@ -0,0 +1,116 @@
+"""
+Icon atlas - every icon decoded and pre-scaled once into a single packed buffer
+
+The atlas is built at startup, before the render workers are started, so
+forked workers share its pages. An icon at an atlas size is served as an
+image view over a slice of the buffer: no decode and no resample per badge.
+Sizes the mapped asset store already has are served as views over the store
+instead, so only icons missing from the store are packed into the buffer.
+"""
+
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image
+from PIL.Image import Resampling
+
+from app.core.logging_config import get_logger
+from app.core.utils.asset_store import asset_store
+from app.core.utils.geometry import fit_size
+
+logger = get_logger("icon_atlas")
+
+ICON_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+Size = Tuple[int, int]
+
+
+def _decode(path: str) -> Image.Image:
+    stored = asset_store.load(path)
+    if stored is not None:
+        return stored
+    with Image.open(path) as img:
+        return img.convert("RGBA")
+
+
+class IconAtlas:
+    def __init__(self):
+        self._buffer = b""
+        # (path, size) -> (offset, width, height) of the RGBA pixels in the buffer
+        self._index: Dict[Tuple[str, Size], Tuple[int, int, int]] = {}
+        # (path, size) -> read-only image over the buffer or the mapped asset store
+        self._views: Dict[Tuple[str, Size], Image.Image] = {}
+        self._original_sizes: Dict[str, Size] = {}
+
+    def build(self, icon_dir: str, boxes: Iterable[int]) -> int:
+        """
+        Pre-scale every icon in icon_dir into each square box and index the results
+
+        Sizes follow ImageLayer's dynamic sizing (aspect ratio kept), so a dynamic
+        icon layer with a max box in boxes resolves to an atlas entry.
+
+        Args:
+            icon_dir: Absolute icon directory
+            boxes: Edge lengths of the square boxes icons are drawn into
+
+        Returns:
+            Number of icons packed
+        """
+        boxes = sorted(set(int(b) for b in boxes))
+        names = sorted(n for n in os.listdir(icon_dir) if n.lower().endswith(ICON_EXTENSIONS))
+        chunks, index, original_sizes, views = [], {}, {}, {}
+        offset = 0
+        for name in names:
+            path = os.path.join(icon_dir, name)
+            original = None
+            original_size = asset_store.original_size(path)
+            if original_size is None:
+                original = _decode(path)
+                original_size = original.size
+            original_sizes[path] = original_size
+            for box in boxes:
+                size = fit_size(original_size, (box, box))
+                if (path, size) in index or (path, size) in views:
+                    continue
+                stored = asset_store.load(path, size)
+                if stored is not None:
+                    views[(path, size)] = stored
+                    continue
+                if original is None:
+                    original = _decode(path)
+                scaled = original if original.size == size else original.resize(size, Resampling.LANCZOS)
+                data = scaled.tobytes()
+                index[(path, size)] = (offset, size[0], size[1])
+                chunks.append(data)
+                offset += len(data)
+
+        self._buffer = b"".join(chunks)
+        self._index = index
+        self._original_sizes = original_sizes
+        view = memoryview(self._buffer)
+        for key, (off, w, h) in index.items():
+            views[key] = Image.frombuffer("RGBA", (w, h), view[off:off + w * h * 4], "raw", "RGBA", 0, 1)
+        self._views = views
+        logger.info(f"Icon atlas: {len(names)} icons at {len(boxes)} sizes, {len(views) - len(index)} "
+                    f"mapped from the asset store, {len(index)} packed into "
+                    f"{len(self._buffer) / (1024 * 1024):.1f} MB")
+        return len(names)
+
+    def get(self, path: str, size: Size) -> Optional[Image.Image]:
+        """Pre-scaled RGBA icon at size (shared and read-only), or None if it isn't in the atlas"""
+        return self._views.get((path, (int(size[0]), int(size[1]))))
+
+    def original_size(self, path: str) -> Optional[Size]:
+        """Size of the icon file before scaling, or None if it isn't in the atlas"""
+        return self._original_sizes.get(path)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "icons": len(self._original_sizes),
+            "entries": len(self._views),
+            "mapped": len(self._views) - len(self._index),
+            "size_bytes": len(self._buffer),
+        }
+
+
+icon_atlas = IconAtlas()
@@ -0,0 +1,73 @@
+"""Process-wide cache of decoded RGBA assets and their resized variants"""
+
+import os
+from typing import Optional, Tuple
+
+from PIL import Image
+from PIL.Image import Resampling
+
+from app.core.utils.asset_store import asset_store
+from app.core.utils.cache import LRUCache
+from app.core.utils.icon_atlas import icon_atlas
+from app.settings import settings
+
+image_cache = LRUCache("images", max_bytes=settings.IMAGE_CACHE_MAX_BYTES)
+
+
+def _image_bytes(img: Image.Image) -> int:
+    if img.readonly:
+        return 0  # a view over the mapped asset store; its pages are shared, not owned
+    return img.width * img.height * len(img.getbands())
+
+
+def load_image(path: str, size: Optional[Tuple[int, int]] = None,
+               resample: Resampling = Resampling.LANCZOS) -> Image.Image:
+    """
+    Load an image as RGBA, optionally resized, through the icon atlas or the image cache
+
+    Cache misses read the normalized asset store first and only decode or
+    resize the original file if the store doesn't have the image.
+
+    The returned image is shared between callers and must not be modified;
+    copy it first if it needs changing.
+
+    Args:
+        path: Absolute image path
+        size: Target (width, height), or None for the original size
+        resample: Resampling filter used when resizing
+
+    Returns:
+        Decoded RGBA image
+    """
+    mtime = os.stat(path).st_mtime_ns
+    if size is None:
+        return image_cache.get_or_create((path, mtime, None, None), lambda: _decode(path),
+                                         sizeof=_image_bytes)
+
+    size = (int(size[0]), int(size[1]))
+    if resample == Resampling.LANCZOS:
+        packed = icon_atlas.get(path, size)
+        if packed is not None:
+            return packed
+
+    def resize():
+        stored = asset_store.load(path, size) if resample == Resampling.LANCZOS else None
+        if stored is not None:
+            return stored
+        original = load_image(path)
+        return original if original.size == size else original.resize(size, resample)
+
+    return image_cache.get_or_create((path, mtime, size, int(resample)), resize, sizeof=_image_bytes)
+
+
+def _decode(path: str) -> Image.Image:
+    stored = asset_store.load(path)
+    if stored is not None:
+        return stored
+    with Image.open(path) as img:
+        return img.convert("RGBA")
+
+
+def image_size(path: str) -> Tuple[int, int]:
+    """Original (width, height) of an image, from the icon atlas, asset store or decoded cache"""
+    return icon_atlas.original_size(path) or asset_store.original_size(path) or load_image(path).size
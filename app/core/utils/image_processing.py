@@ -1,15 +1,125 @@
-from PIL import Image, ImageDraw
+import math
+from typing import Any, Dict, List, Sequence, Tuple
+
+from PIL import Image, ImageChops, ImageColor, ImageDraw
 from PIL.Image import Resampling
 
+from app.core.utils.cache import LRUCache
+from app.settings import settings
 
-def make_linear_gradient(size, start_hex, end_hex, vertical=True):
+gradient_cache = LRUCache("gradients", max_bytes=settings.GRADIENT_CACHE_MAX_BYTES)
+
+Stop = Tuple[float, Tuple[int, int, int]]
+
+
+def _normalize_stops(stops: Sequence) -> Tuple[Stop, ...]:
+    """Parse [(offset, color), ...] or [{"offset":, "color":}, ...] into sorted RGB stops"""
+    parsed = []
+    for stop in stops:
+        offset, color = (stop.get("offset"), stop.get("color")) if isinstance(stop, dict) else stop
+        parsed.append((min(1.0, max(0.0, float(offset))), ImageColor.getrgb(color)[:3]))
+    if not parsed:
+        raise ValueError("Gradient needs at least one color stop")
+    parsed.sort(key=lambda s: s[0])
+    return tuple(parsed)
+
+
+def _color_ramp(stops: Tuple[Stop, ...], n: int) -> List[Tuple[int, int, int]]:
+    """Sample the stops at n evenly spaced positions from 0 to 1"""
+    ramp = []
+    seg = 0
+    for i in range(n):
+        t = i / (n - 1) if n > 1 else 0.0
+        while seg < len(stops) - 1 and t > stops[seg + 1][0]:
+            seg += 1
+        (t0, c0) = stops[seg]
+        (t1, c1) = stops[min(seg + 1, len(stops) - 1)]
+        if t <= t0 or t1 <= t0:
+            ramp.append(c0 if t <= t0 else c1)
+            continue
+        f = min(1.0, (t - t0) / (t1 - t0))
+        ramp.append(tuple(int(a + (b - a) * f + 0.5) for a, b in zip(c0, c1)))
+    return ramp
+
+
+def _axis_strip(length: int, stops, along_x: bool) -> Image.Image:
+    """One row (or column) of RGBA gradient pixels"""
+    data = b"".join(bytes((r, g, b, 255)) for r, g, b in _color_ramp(stops, length))
+    return Image.frombytes("RGBA", (length, 1) if along_x else (1, length), data)
+
+
+def _linear_ramp(length: int, lo: float, hi: float, along_x: bool) -> Image.Image:
+    """One row (or column) of "L" values going linearly from lo to hi"""
+    step = (hi - lo) / (length - 1) if length > 1 else 0.0
+    data = bytes(int(lo + step * i + 0.5) for i in range(length))
+    return Image.frombytes("L", (length, 1) if along_x else (1, length), data)
+
+
+def _build_gradient(size, stops, angle):
     w, h = size
-    base = Image.new("RGB", size, start_hex)
-    top  = Image.new("RGB", size, end_hex)
-    mask = Image.linear_gradient("L")
-    if not vertical: mask = mask.rotate(90, expand=True)
-    mask = mask.resize(size, Resampling.LANCZOS)
-    return Image.composite(top, base, mask).convert("RGBA")
+    rad = math.radians(angle)
+    dx, dy = math.cos(rad), math.sin(rad)
+    if abs(dx) < 1e-9 or abs(dy) < 1e-9:
+        # Axis aligned: build a single strip and broadcast it across the canvas
+        along_x = abs(dy) < 1e-9
+        reverse = (dx if along_x else dy) < 0
+        length = w if along_x else h
+        strip = _axis_strip(length, stops, along_x)
+        if reverse:
+            strip = strip.transpose(Image.Transpose.FLIP_LEFT_RIGHT if along_x else Image.Transpose.FLIP_TOP_BOTTOM)
+        return strip.resize(size, Resampling.NEAREST)
+
+    # Diagonal: position along the gradient is t(x, y) = x*dx + y*dy, which is the sum of
+    # a per-column and a per-row term. Broadcast both, add them and map through the ramp.
+    px = [0.0, (w - 1) * dx]
+    py = [0.0, (h - 1) * dy]
+    span = (max(px) - min(px)) + (max(py) - min(py))
+    u = _linear_ramp(w, (px[0] - min(px)) * 255 / span, (px[1] - min(px)) * 255 / span, True)
+    v = _linear_ramp(h, (py[0] - min(py)) * 255 / span, (py[1] - min(py)) * 255 / span, False)
+    t = ImageChops.add(u.resize(size, Resampling.NEAREST), v.resize(size, Resampling.NEAREST))
+    t.putpalette(b"".join(bytes(c) for c in _color_ramp(stops, 256)))
+    return t.convert("RGBA")
+
+
+def linear_gradient(size, stops, angle=90.0) -> Image.Image:
+    """
+    Cached RGBA linear gradient
+
+    The returned image is shared and must not be modified.
+
+    Args:
+        size: Tuple (width, height)
+        stops: Color stops as [(offset, color), ...] with offsets from 0 to 1
+        angle: Direction in degrees, clockwise from left-to-right (90 = top-to-bottom)
+
+    Returns:
+        RGBA gradient image
+    """
+    size = (int(size[0]), int(size[1]))
+    stops = _normalize_stops(stops)
+    angle = float(angle) % 360
+    key = (size, stops, angle)
+    return gradient_cache.get_or_create(key, lambda: _build_gradient(size, stops, angle),
+                                        sizeof=lambda img: img.width * img.height * 4)
+
+
+def gradient_from_spec(size, spec: Dict[str, Any]) -> Image.Image:
+    """
+    Cached gradient for a fill/gradient spec
+
+    Supports start_color/end_color, an optional list of "stops" and either
+    "vertical" (True = top-to-bottom, False = left-to-right) or an explicit "angle".
+    """
+    stops = spec.get("stops") or [(0.0, spec.get("start_color", "#FFFFFF")),
+                                  (1.0, spec.get("end_color", "#FFFFFF"))]
+    angle = spec.get("angle")
+    if angle is None:
+        angle = 90 if spec.get("vertical", True) else 0
+    return linear_gradient(size, stops, angle)
+
+
+def make_linear_gradient(size, start_hex, end_hex, vertical=True):
+    return linear_gradient(size, [(0.0, start_hex), (1.0, end_hex)], 90 if vertical else 0)
 
 
 def circle_mask(size, margin):
@@ -0,0 +1,11 @@
+"""Project root and asset path resolution"""
+
+import os
+
+# Project root (go up from app/core/utils to project root)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def resolve_asset_path(path: str) -> str:
+    """Resolve an asset path relative to the project root"""
+    return os.path.join(PROJECT_ROOT, path)
@@ -0,0 +1,213 @@
+"""Cached shape masks and border bitmaps
+
+Only the coverage (fill and border masks cropped to the box the shape
+paints) and the scanline span tables are cached. Full-canvas masks are
+built from them on demand.
+"""
+
+import json
+import math
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from app.core.utils.cache import LRUCache
+from app.core.utils.image_processing import circle_mask, polygon_mask, rounded_rect_mask, shield_points
+from app.settings import settings
+
+shape_cache = LRUCache("shapes", max_bytes=settings.SHAPE_CACHE_MAX_BYTES)
+
+# Shapes ShapeLayer can draw
+SHAPES = ("hexagon", "circle", "shield", "rounded_rect")
+
+
+class ShapeCoverage(NamedTuple):
+    """Fill and border masks cropped to the box the shape actually paints"""
+    rect: Optional[Tuple[int, int, int, int]]
+    fill: Optional[Image.Image]
+    border: Optional[Image.Image]
+
+
+class ShapeSpans(NamedTuple):
+    """Per-row horizontal extent of a shape's mask: rows top..bottom-1 are covered,
+    and row y spans x in [left[y], right[y]) (empty rows have left == right == W//2).
+    x0..x1 is the widest extent over all rows."""
+    top: int
+    bottom: int
+    x0: int
+    x1: int
+    left: Tuple[int, ...]
+    right: Tuple[int, ...]
+
+    def at(self, y) -> Tuple[int, int]:
+        """(left, right) of the row at y; rows outside the canvas are empty"""
+        y = int(y)
+        if 0 <= y < len(self.left):
+            return self.left[y], self.right[y]
+        return self.left[0], self.left[0]
+
+
+def _mask_bytes(mask: Image.Image) -> int:
+    return mask.width * mask.height
+
+
+def _coverage_bytes(cov: ShapeCoverage) -> int:
+    return sum(_mask_bytes(m) for m in (cov.fill, cov.border) if m is not None)
+
+
+def _params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def hexagon_points(W, H, params):
+    r = int(params.get("radius", min(W,H)//2 - 20))
+    cx, cy = W//2, H//2
+    ang = math.pi/3
+    return [(cx + r*math.cos(i*ang), cy + r*math.sin(i*ang)) for i in range(6)]
+
+
+def circle_margin(W, H, params):
+    radius = int(params.get("radius", min(W,H)//2 - 50))
+    return max(0, (min(W,H)//2) - radius)
+
+
+def shield_geometry(W, H, params):
+    margin = int(params.get("margin", 56))
+    r      = int(params.get("corner_radius", 56))
+    tip_h  = int(params.get("tip_height", 110))
+    rect, tip = shield_points(W,H,margin,r,tip_h)
+    return rect, tip, r
+
+
+def rounded_rect_geometry(W, H, params):
+    # Use width, height, radius instead of rect coordinates
+    width = int(params.get("width", 450))
+    height = int(params.get("height", 450))
+    radius = int(params.get("radius", 50))
+
+    # Center the rectangle on canvas
+    cx, cy = W//2, H//2
+    rect = [cx - width//2, cy - height//2, cx + width//2, cy + height//2]
+    return rect, radius
+
+
+def _build_mask(shape, params, size):
+    W, H = size
+    if shape == "hexagon":
+        return polygon_mask(size, hexagon_points(W, H, params))
+    if shape == "circle":
+        return circle_mask(size, circle_margin(W, H, params))
+    if shape == "shield":
+        rect, tip, r = shield_geometry(W, H, params)
+        m = Image.new("L", size, 0); d = ImageDraw.Draw(m)
+        d.rounded_rectangle(rect, radius=r, fill=255)
+        d.polygon(tip, fill=255)
+        return m
+    if shape == "rounded_rect":
+        rect, radius = rounded_rect_geometry(W, H, params)
+        return rounded_rect_mask(size, rect, radius)
+    raise ValueError(f"Unknown shape: {shape}")
+
+
+def _build_border(shape, params, size, width):
+    W, H = size
+    m = Image.new("L", size, 0)
+    d = ImageDraw.Draw(m)
+    if shape == "hexagon":
+        d.polygon(hexagon_points(W, H, params), outline=255, width=width)
+    elif shape == "circle":
+        margin = circle_margin(W, H, params)
+        d.ellipse([margin, margin, W-margin, H-margin], outline=255, width=width)
+    elif shape == "shield":
+        rect, tip, r = shield_geometry(W, H, params)
+        d.rounded_rectangle(rect, radius=r, outline=255, width=width)
+        d.line(tip + [tip[0]], fill=255, width=width, joint="curve")
+    elif shape == "rounded_rect":
+        rect, radius = rounded_rect_geometry(W, H, params)
+        d.rounded_rectangle(rect, radius=radius, outline=255, width=width)
+    return m
+
+
+def _uncrop(mask: Optional[Image.Image], rect, size: Tuple[int, int]) -> Image.Image:
+    full = Image.new("L", size, 0)
+    if mask is not None:
+        full.paste(mask, rect[:2])
+    return full
+
+
+def shape_mask(shape: str, params: Dict[str, Any], size: Tuple[int, int]) -> Image.Image:
+    """
+    Full-canvas coverage mask ("L") of a shape, expanded from its cached coverage
+
+    Returns a new mask on every call; prefer shape_coverage on render paths.
+    """
+    cov = shape_coverage(shape, params, size)
+    return _uncrop(cov.fill, cov.rect, size)
+
+
+def border_mask(shape: str, params: Dict[str, Any], size: Tuple[int, int], width: int) -> Image.Image:
+    """
+    Full-canvas outline coverage ("L") of a shape border, expanded from its cached coverage
+
+    Returns a new mask on every call; prefer shape_coverage on render paths.
+    """
+    cov = shape_coverage(shape, params, size, width)
+    return _uncrop(cov.border, cov.rect, size)
+
+
+def _union(a, b):
+    if a is None: return b
+    if b is None: return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def shape_coverage(shape: str, params: Dict[str, Any], size: Tuple[int, int],
+                   border_width: int = 0) -> ShapeCoverage:
+    """
+    Shape fill and border masks cropped to their combined bounding box
+
+    Cached per (shape, params, canvas size, border width); border_width 0 means no border.
+    The returned masks are shared and must not be modified.
+    """
+    def build():
+        # The full-canvas masks are only needed to find and crop to the painted box
+        fill = _build_mask(shape, params, size)
+        border = _build_border(shape, params, size, int(border_width)) if border_width > 0 else None
+        rect = _union(fill.getbbox(), border.getbbox() if border else None)
+        if rect is None:
+            return ShapeCoverage(None, None, None)
+        return ShapeCoverage(rect, fill.crop(rect), border.crop(rect) if border else None)
+
+    key = ("coverage", shape, _params_key(params), tuple(size), int(border_width))
+    return shape_cache.get_or_create(key, build, sizeof=_coverage_bytes)
+
+
+def _build_spans(mask: Image.Image) -> ShapeSpans:
+    W, H = mask.size
+    data = mask.tobytes()
+    empty = W // 2
+    left, right, rows = [], [], []
+    for y in range(H):
+        row = data[y * W:(y + 1) * W]
+        r = len(row.rstrip(b"\x00"))
+        if r:
+            left.append(W - len(row.lstrip(b"\x00"))); right.append(r); rows.append(y)
+        else:
+            left.append(empty); right.append(empty)
+    if not rows:
+        return ShapeSpans(0, 0, empty, empty, tuple(left), tuple(right))
+    x0 = min(left[y] for y in rows)
+    x1 = max(right[y] for y in rows)
+    return ShapeSpans(rows[0], rows[-1] + 1, x0, x1, tuple(left), tuple(right))
+
+
+def shape_spans(shape: str, params: Dict[str, Any], size: Tuple[int, int]) -> ShapeSpans:
+    """
+    Scanline span table of a shape, derived from its fill mask
+
+    Cached per (shape, params, canvas size), so per-row lookups are O(1) and
+    match exactly what ShapeLayer paints.
+    """
+    key = ("spans", shape, _params_key(params), tuple(size))
+    return shape_cache.get_or_create(key, lambda: _build_spans(_build_mask(shape, params, size)),
+                                     sizeof=lambda spans: 16 * len(spans.left))
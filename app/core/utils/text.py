@@ -1,11 +1,95 @@
-from PIL import ImageFont
+from dataclasses import dataclass
+from typing import Iterator, Tuple
 
+from app.core.utils.cache import LRUCache
+from app.core.utils.fonts import font_registry
+from app.settings import settings
 
-def load_font(path, size, fallback=None):
-    try:
-        return ImageFont.truetype(path, int(size))
-    except Exception:
-        return fallback or ImageFont.load_default()
+# Laid-out text blocks keyed by (text, font path, size, max width, line gap);
+# badge variants and repeat renders of one title re-use the layout
+layout_cache = LRUCache("text_layout", max_entries=settings.TEXT_LAYOUT_CACHE_MAX_ENTRIES)
+# Advance width of single words (and the space) per (font path, size)
+advance_cache = LRUCache("word_advances", max_entries=settings.TEXT_ADVANCE_CACHE_MAX_ENTRIES)
+
+
+@dataclass(frozen=True)
+class TextLayout:
+    """A block of wrapped text measured once: line strings, pixel widths and heights"""
+    lines: Tuple[str, ...]
+    widths: Tuple[int, ...]
+    heights: Tuple[int, ...]
+    gap: int
+
+    @property
+    def width(self) -> int:
+        return max(self.widths) if self.widths else 0
+
+    @property
+    def height(self) -> int:
+        return sum(self.heights) + self.gap * (len(self.heights) - 1) if self.heights else 0
+
+    def line_offsets(self) -> Iterator[int]:
+        """Top y of each line relative to the block's top"""
+        y = 0
+        for h in self.heights:
+            yield y
+            y += h + self.gap
+
+
+def load_font(path, size):
+    """Get a cached FreeType face; raises FontError if the font can't be loaded"""
+    return font_registry.get(path, size)
+
+
+def _advance(font, path, size, word):
+    return advance_cache.get_or_create((path, size, word), lambda: font.getlength(word))
+
+
+def _wrap(text, font, path, size, max_w):
+    """Greedy line packing from cached word advances; one pass over the words"""
+    space = _advance(font, path, size, " ")
+    lines = []
+    for para in text.split("\n"):
+        cur, cur_w = [], 0.0
+        for w in para.split():
+            adv = _advance(font, path, size, w)
+            if not cur:
+                cur, cur_w = [w], adv
+            elif cur_w + space + adv <= max_w:
+                cur.append(w); cur_w += space + adv
+            else:
+                lines.append(" ".join(cur)); cur, cur_w = [w], adv
+        lines.append(" ".join(cur))
+    return lines
+
+
+def _layout(text, path, size, max_w, gap):
+    font = load_font(path, size)
+    lines = _wrap(text, font, path, size, max_w) if max_w else text.split("\n")
+    widths, heights = [], []
+    for ln in lines:
+        widths.append(int(font.getlength(ln)))
+        bbox = font.getbbox(ln)
+        heights.append(bbox[3] - bbox[1])
+    return TextLayout(tuple(lines), tuple(widths), tuple(heights), gap)
+
+
+def layout_text(text, path, size, max_w=None, line_gap=6) -> TextLayout:
+    """
+    Wrap and measure a block of text
+
+    Args:
+        text: Text to lay out; explicit newlines always break
+        path: Font path (None for the default font)
+        size: Font size in points
+        max_w: Maximum line width in pixels, or None to only split on newlines
+        line_gap: Pixels between lines
+
+    Returns:
+        Cached TextLayout (shared; immutable)
+    """
+    key = (text, path, size, max_w or None, int(line_gap))
+    return layout_cache.get_or_create(key, lambda: _layout(*key))
 
 
 def resolve_align(pos, box_w, box_h, img_w, img_h):
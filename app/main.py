@@ -2,6 +2,9 @@
 FastAPI main application entry point
 """
 
+import asyncio
+import os
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
@@ -11,11 +14,27 @@ from app.settings import settings
 from app.controllers.badge_image import router as badges_router
 from app.controllers.health import router as health_router
 from app.core.logging_config import get_logger
+from app.core.encoder import EncodeOptions
 from app.core.middleware import LoggingMiddleware
+from app.core.layers.image import LogoLayer
+from app.core.render_executor import render_executor
+from app.core.utils.asset_store import asset_store
+from app.core.utils.fonts import font_registry
+from app.core.utils.icon_atlas import icon_atlas
+from app.core.utils.paths import resolve_asset_path
+from app.core.utils.shapes import shape_coverage, shape_spans
+from app.services.warmup_service import warmup_service
 
 # Initialize logger
 logger = get_logger("main")
 
+LOGO_DIR = "assets/logos"
+# Shapes the config generator draws with fixed geometry
+PRELOAD_SHAPES = (("hexagon", {"radius": 250}), ("circle", {"radius": 250}))
+
+_assets_preloaded = False
+_background_tasks = set()
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -36,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Badge-Config", "X-Render-Cache", "X-Process-Time", "Server-Timing"],
 )
 
 # Exception handlers
@@ -69,11 +89,75 @@ async def root():
         "health": f"{settings.API_V1_STR}/health"
     }
 
+def preload_assets():
+    """
+    Load fonts, the asset store, the icon atlas, logos and shape masks into this process
+
+    Runs once per process. The pre-fork server (app.server) calls it before
+    forking so its workers share the pages; render workers forked by the
+    executor inherit them either way.
+    """
+    global _assets_preloaded
+    if _assets_preloaded:
+        return
+    font_registry.preload(sizes=settings.FONT_PRELOAD_SIZES)
+    asset_store.open()
+    if settings.ICON_ATLAS_ENABLED:
+        icon_atlas.build(resolve_asset_path(settings.ICON_ATLAS_DIR), settings.ICON_ATLAS_SIZES)
+
+    canvas = (settings.CANVAS_WIDTH, settings.CANVAS_HEIGHT)
+    logo_dir = resolve_asset_path(LOGO_DIR)
+    for name in sorted(os.listdir(logo_dir)) if os.path.isdir(logo_dir) else []:
+        # Dynamic size, as the config generator places logos
+        LogoLayer({"path": os.path.join(LOGO_DIR, name), "size": {"dynamic": True}}).compile(canvas)
+    for shape, params in PRELOAD_SHAPES:
+        shape_coverage(shape, params, canvas)
+        shape_spans(shape, params, canvas)
+    _assets_preloaded = True
+    logger.info("Preloaded fonts, icons, logos and shape masks")
+
+def check_backends():
+    """
+    Fail at startup rather than on the first render if the configured
+    compositor or output format is missing from this build
+
+    Raises:
+        ImportError: If COMPOSITOR is numpy and numpy is not installed
+        ValueError: If OUTPUT_FORMAT is not supported by the installed Pillow
+    """
+    if settings.COMPOSITOR == "numpy":
+        import app.core.numpy_compositor  # noqa: F401
+    try:
+        EncodeOptions.from_canvas(None)
+    except ValueError as e:
+        raise ValueError(f"OUTPUT_FORMAT={settings.OUTPUT_FORMAT} cannot be used: {e}") from e
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize logging on startup"""
     logger.info(f"Starting {settings.PROJECT_NAME} on port {settings.PORT}")
     logger.info(f"API documentation available at http://localhost:{settings.PORT}/docs")
+    check_backends()
+    logger.info(f"Compositing backend: {settings.COMPOSITOR}")
+    # Load assets before starting render workers so forked workers inherit them
+    preload_assets()
+    # Warm up in the background: /health answers meanwhile, /ready once workers start warm.
+    # Renders requested before then wait for the warm pool.
+    render_executor.defer_start()
+    task = asyncio.create_task(_warm_up_and_start())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def _warm_up_and_start():
+    try:
+        await warmup_service.warm_up()
+    finally:
+        render_executor.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop render workers"""
+    render_executor.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
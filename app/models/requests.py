@@ -2,19 +2,51 @@
 Request models for API endpoints
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional, Union
 from pydantic import BaseModel, Field
 
 class CanvasConfig(BaseModel):
     """Canvas configuration (dimensions are fixed at 600x600)"""
     bg: str = Field(default="white", description="Background color")
     scale_factor: float = Field(default=1.0, description="Scale factor for final image")
+    format: Optional[Literal["png", "webp", "webp_lossy", "avif"]] = Field(
+        default=None, description="Output format: png, webp (lossless), webp_lossy or avif (defaults to OUTPUT_FORMAT)")
+    compress_level: Optional[int] = Field(default=None, ge=0, le=9, description="PNG zlib compression level (defaults to PNG_COMPRESS_LEVEL)")
+    optimize: Optional[bool] = Field(default=None, description="Run PNG optimize pass (defaults to PNG_OPTIMIZE)")
+    quality: Optional[int] = Field(default=None, ge=0, le=100, description="Quality for webp_lossy/avif (defaults to OUTPUT_QUALITY)")
 
 class BadgeRequest(BaseModel):
     """Badge generation request model"""
     canvas: CanvasConfig = Field(default_factory=CanvasConfig)
     layers: List[Dict[str, Any]] = Field(description="Array of layer configurations")
 
+class TemplateRequest(BadgeRequest):
+    """Template registration request: a badge configuration with {{placeholder}} strings"""
+    defaults: Dict[str, str] = Field(default_factory=dict, description="Values for placeholders a render request may omit")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "canvas": {"bg": "white"},
+                "layers": [
+                    {"type": "ShapeLayer", "shape": "hexagon", "fill": {"mode": "solid", "color": "#FFD700"},
+                     "params": {"radius": 250}, "z": 10},
+                    {"type": "TextLayer", "text": "{{title}}", "font": {"path": "assets/fonts/ArialBold.ttf", "size": 42},
+                     "color": "{{text_color}}", "align": {"x": "center", "y": "dynamic"}, "z": 30}
+                ],
+                "defaults": {"text_color": "#000000"}
+            }
+        }
+
+class TemplateRenderRequest(BaseModel):
+    """Values for a registered template's placeholders"""
+    values: Dict[str, str] = Field(default_factory=dict, description="Placeholder name -> value")
+
+    class Config:
+        json_schema_extra = {
+            "example": {"values": {"title": "Python Expert"}}
+        }
+
 class TextOverlayBadgeRequest(BaseModel):
     """Request model for generating badge with text overlay"""
     short_title: str = Field(description="Short badge title text")
@@ -37,6 +69,22 @@ class TextOverlayBadgeRequest(BaseModel):
             }
         }
 
+class BadgeVariantsRequest(TextOverlayBadgeRequest):
+    """Request model for generating several text overlay variants of one title"""
+    seeds: Optional[List[int]] = Field(default=None, min_length=1, description="Seeds to render, one variant each; not allowed with count")
+    count: Optional[int] = Field(default=None, ge=1, description="Number of variants; seeds are seed, seed+1, ... (random start if seed is unset); not allowed with seeds")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "short_title": "Python Expert",
+                "institute": "MIT",
+                "achievement_phrase": "Code with Confidence",
+                "count": 12,
+                "seed": 100
+            }
+        }
+
 class IconBasedBadgeRequest(BaseModel):
     """Request model for generating badge with icon"""
     icon_name: str = Field(description="Icon filename (e.g., 'atom.png', 'trophy.png')")
@@ -98,4 +146,22 @@ class IconBasedBadgeRequest(BaseModel):
                     }
                 ]
             }
-        }
\ No newline at end of file
+        }
+
+class BatchBadgeRequest(BaseModel):
+    """Request model for generating many badges in one call"""
+    items: List[Union[TextOverlayBadgeRequest, IconBasedBadgeRequest, BadgeRequest]] = Field(
+        min_length=1,
+        description="Badge requests: raw layer configs, text overlay or icon-based requests"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"short_title": "Python Expert", "institute": "MIT", "achievement_phrase": "Code with Confidence", "seed": 1},
+                    {"icon_name": "trophy.png", "seed": 2},
+                    {"canvas": {"bg": "white"}, "layers": [{"type": "ShapeLayer", "shape": "circle", "params": {"radius": 250}, "z": 10}]}
+                ]
+            }
+        }
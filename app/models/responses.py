@@ -2,7 +2,7 @@
 Response models for API endpoints
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 
 class BadgeData(BaseModel):
@@ -17,6 +17,8 @@ class BadgeResponse(BaseModel):
     message: str = Field(description="Status message")
     data: BadgeData = Field(description="Generated badge data")
     config: Dict[str, Any] = Field(description="Configuration used to generate the badge")
+    cached: bool = Field(default=False, description="Whether the image was served from the render cache")
+    debug: Optional[Dict[str, Any]] = Field(default=None, description="Render timing spans, when RENDER_TIMING_ENABLED is set")
 
     class Config:
         json_schema_extra = {
@@ -31,6 +33,28 @@ class BadgeResponse(BaseModel):
                 "config": {
                     "canvas": {"width": 600, "height": 600},
                     "layers": []
-                }
+                },
+                "cached": False
             }
-        }
\ No newline at end of file
+        }
+
+class BadgeVariant(BaseModel):
+    """One rendered variant in a variants response"""
+    seed: int = Field(description="Seed the variant's configuration was generated from")
+    data: BadgeData = Field(description="Generated badge data")
+    config: Dict[str, Any] = Field(description="Configuration used to generate the badge")
+    cached: bool = Field(default=False, description="Whether the image was served from a cache")
+
+class BadgeVariantsResponse(BaseModel):
+    """Badge variants response model"""
+    success: bool = Field(description="Operation success status")
+    message: str = Field(description="Status message")
+    variants: List[BadgeVariant] = Field(description="Rendered variants, in seed order")
+
+class TemplateResponse(BaseModel):
+    """Template registration response model"""
+    success: bool = Field(description="Operation success status")
+    message: str = Field(description="Status message")
+    template_id: str = Field(description="Id to render the template with")
+    placeholders: List[str] = Field(description="Placeholder names found in the template")
+    plate_layers: int = Field(description="Number of layers pre-rendered into the base plate")
@@ -0,0 +1,158 @@
+"""
+Pre-fork production server
+
+    python -m app.server
+
+The parent process imports the app, preloads fonts, icons, logos and shape
+masks, runs the warm-up renders, binds the listening socket and then forks
+SERVER_WORKERS uvicorn workers. The workers share the preloaded pages
+copy-on-write and accept connections from the same socket.
+
+A worker exits gracefully after SERVER_MAX_REQUESTS requests (plus a random
+jitter, so workers don't all restart together). The parent then forks a
+replacement from its still-warm state. SIGTERM/SIGINT stop every worker,
+giving in-flight requests SERVER_GRACEFUL_TIMEOUT seconds to finish.
+"""
+
+import asyncio
+import os
+import random
+import signal
+import socket
+import time
+from typing import Dict
+
+import uvicorn
+
+from app.core.logging_config import get_logger
+from app.core.render_executor import render_executor
+from app.main import app, check_backends, preload_assets
+from app.services.warmup_service import warmup_service
+from app.settings import settings
+
+logger = get_logger("server")
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve(sock: socket.socket, worker_id: int):
+    """Worker process body: run uvicorn on the shared socket until it recycles or is stopped"""
+    # Forked children start with the parent's RNG state; unseeded renders must still differ
+    random.seed()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    max_requests = None
+    if settings.SERVER_MAX_REQUESTS > 0:
+        max_requests = settings.SERVER_MAX_REQUESTS + random.randint(0, max(0, settings.SERVER_MAX_REQUESTS_JITTER))
+    config = uvicorn.Config(
+        app,
+        log_level="info",
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+    )
+    logger.info(f"Worker {worker_id} (pid {os.getpid()}) serving"
+                + (f", recycling after {max_requests} requests" if max_requests else ""))
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class PreforkServer:
+    """Parent process that keeps SERVER_WORKERS forked uvicorn workers running"""
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.children: Dict[int, int] = {}  # pid -> worker id
+        self.stopping = False
+
+    def _spawn(self, sock: socket.socket, worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _serve(sock, worker_id)
+            except BaseException:
+                logger.exception(f"Worker {worker_id} crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = worker_id
+
+    def _stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"Stopping {len(self.children)} workers")
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self, deadline: float):
+        """Wait for stopping workers until the deadline, then kill the rest"""
+        while self.children and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                time.sleep(0.1)
+            else:
+                self.children.pop(pid, None)
+        for pid in self.children:
+            logger.warning(f"Worker pid {pid} did not stop in time; killing it")
+            os.kill(pid, signal.SIGKILL)
+        self.children.clear()
+
+    def run(self, host: str, port: int):
+        """Preload, bind and supervise workers until SIGTERM/SIGINT"""
+        check_backends()
+        preload_assets()
+        # Warm the caches once here; workers find the warm-up done and are ready at startup
+        asyncio.run(warmup_service.warm_up())
+        sock = _bind(host, port)
+        # Each worker runs its own render pool; split the cores between them
+        if settings.RENDER_WORKERS == 0:
+            render_executor.workers = max(1, (os.cpu_count() or 1) // self.workers)
+        logger.info(f"Pre-fork server on {host}:{port} with {self.workers} workers "
+                    f"({render_executor.workers} render workers each)")
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for worker_id in range(self.workers):
+            self._spawn(sock, worker_id)
+
+        while not self.stopping:
+            try:
+                pid, status = os.wait()
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+            worker_id = self.children.pop(pid, None)
+            if worker_id is None or self.stopping:
+                continue
+            if os.waitstatus_to_exitcode(status) == 0:
+                logger.info(f"Worker {worker_id} recycled; starting a replacement")
+            else:
+                logger.warning(f"Worker {worker_id} exited with status {os.waitstatus_to_exitcode(status)}; "
+                               f"restarting it")
+                time.sleep(1)  # don't spin if workers crash on startup
+            self._spawn(sock, worker_id)
+
+        self._reap(time.monotonic() + settings.SERVER_GRACEFUL_TIMEOUT + 5)
+        sock.close()
+        logger.info("Server stopped")
+
+
+def main():
+    PreforkServer(settings.SERVER_WORKERS).run(settings.SERVER_HOST, settings.PORT)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,81 +2,147 @@
 Badge generation service
 """
 
+import asyncio
 import base64
+import dataclasses
 import time
-from io import BytesIO
-from typing import Dict, Any
-
-from app.core.composer import render_from_spec
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.core.composer import spec_fingerprint
+from app.core.encoder import EncodedImage, EncodeOptions, encode_stats
+from app.core.render_executor import render_executor
+from app.core.timing import Timings, new_timings, timed
+from app.core.utils.cache import LRUCache
 from app.models.responses import BadgeResponse, BadgeData
 from app.core.logging_config import get_logger, log_badge_generation
+from app.settings import settings
 
 # Use main API logger
 logger = get_logger("badge_service")
 
+
+@dataclass
+class RenderedBadge:
+    """Encoded badge image plus the configuration it was rendered from"""
+    image: bytes
+    config: Dict[str, Any] = field(default_factory=dict)
+    media_type: str = "image/png"
+    cached: bool = False
+    timings: Optional[Timings] = None
+
+    def data_uri(self) -> str:
+        return f"data:{self.media_type};base64,{base64.b64encode(self.image).decode('utf-8')}"
+
+    def to_response(self) -> BadgeResponse:
+        with timed(self.timings, "base64"):
+            data = BadgeData(
+                base64=self.data_uri()
+                #filename="badge.png",
+                #mimeType="image/png"
+            )
+        return BadgeResponse(
+            success=True,
+            message="Badge generated successfully",
+            data=data,
+            config=self.config,
+            cached=self.cached,
+            debug={"timings": self.timings.to_list()} if self.timings is not None else None
+        )
+
+
+def apply_canvas_defaults(config: Dict[str, Any]) -> EncodeOptions:
+    """
+    Fix the canvas size and add the default background layer (in place)
+
+    Args:
+        config: Badge configuration dictionary
+
+    Returns:
+        EncodeOptions read from the canvas
+    """
+    # Add fixed canvas dimensions
+    if "canvas" not in config:
+        config["canvas"] = {}
+    config["canvas"]["width"] = 600
+    config["canvas"]["height"] = 600
+
+    # Add default background layer
+    config["layers"].insert(0, {
+        "type": "BackgroundLayer",
+        "mode": "solid",
+        "color": "#FFFFFF00",
+        "z": 0
+    })
+
+    return EncodeOptions.from_canvas(config["canvas"])
+
+
 class BadgeService:
     """Service for generating badge images"""
 
-    async def generate_badge(self, config: Dict[str, Any]) -> BadgeResponse:
+    def __init__(self):
+        # Encoded images keyed by the content hash of the normalized spec
+        self.cache = LRUCache(
+            "renders",
+            max_bytes=settings.RENDER_CACHE_MAX_BYTES,
+            ttl=settings.RENDER_CACHE_TTL_SECONDS or None,
+        )
+
+    def _prepare(self, config: Dict[str, Any]) -> Tuple[EncodeOptions, Optional[str]]:
+        """Fill in canvas defaults and the background layer; return encode options and cache key"""
+        options = apply_canvas_defaults(config)
+
+        # Identical specs (after defaults are filled in) reuse the encoded image
+        cache_key = None
+        if settings.RENDER_CACHE_ENABLED:
+            cache_key = f"{spec_fingerprint(config)}:{options.cache_key()}"
+        return options, cache_key
+
+    async def render_badge(self, config: Dict[str, Any], timings: Optional[Timings] = None) -> RenderedBadge:
         """
-        Generate a badge image from configuration
+        Render a badge image from configuration
 
         Args:
             config: Badge configuration dictionary
+            timings: Optional Timings to record prepare, queue and the worker's render spans in
 
         Returns:
-            BadgeResponse with base64 encoded image
+            RenderedBadge with the encoded image bytes
         """
         start_time = time.time()
 
         try:
             logger.info("Starting badge generation")
 
-            # Add fixed canvas dimensions
-            if "canvas" not in config:
-                config["canvas"] = {}
-            config["canvas"]["width"] = 600
-            config["canvas"]["height"] = 600
-
-            # Add default background layer
-            config["layers"].insert(0, {
-                "type": "BackgroundLayer",
-                "mode": "solid",
-                "color": "#FFFFFF00",
-                "z": 0
-            })
-
-            # Generate badge using composer
-            image = render_from_spec(config)
-
-            if image is None:
-                raise ValueError("Failed to generate badge image")
-
-            # Convert PIL Image to base64
-            buffer = BytesIO()
-            image.save(buffer, format='PNG')
-            buffer.seek(0)
-
-            # Encode to base64
-            img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            with timed(timings, "prepare"):
+                options, cache_key = self._prepare(config)
+            encoded = self.cache.get(cache_key) if cache_key else None
+            cached = encoded is not None
+
+            if not cached:
+                # Render and encode on the render executor so the event loop stays free
+                submitted = time.perf_counter()
+                encoded = await render_executor.render_image(config, options, timed=timings is not None)
+                if encoded.timings is not None:
+                    worker = encoded.timings
+                    # Time waiting for a free worker and moving the spec and image between processes
+                    timings.add("queue", time.perf_counter() - submitted
+                                - worker.seconds("parse") - worker.seconds("render") - worker.seconds("encode"))
+                    timings.extend(worker.spans)
+                    encoded = dataclasses.replace(encoded, timings=None)
+                encode_stats.record(encoded)
+                if cache_key:
+                    self.cache.put(cache_key, encoded, len(encoded.data))
 
             generation_time = time.time() - start_time
 
             # Log successful generation
             log_badge_generation(config, success=True, generation_time=generation_time)
-            logger.info(f"Badge generated successfully in {generation_time:.3f}s")
-
-            # Create response
-            return BadgeResponse(
-                success=True,
-                message="Badge generated successfully",
-                data=BadgeData(
-                    base64=f"data:image/png;base64,{img_base64}"
-                    #filename="badge.png",
-                    #mimeType="image/png"
-                ),
-                config=config
-            )
+            logger.info(f"Badge generated successfully in {generation_time:.3f}s (cache {'hit' if cached else 'miss'})")
+
+            return RenderedBadge(image=encoded.data, config=config,
+                                 media_type=encoded.media_type, cached=cached, timings=timings)
 
         except Exception as e:
             generation_time = time.time() - start_time
@@ -85,4 +151,74 @@ class BadgeService:
             # Log failed generation
             log_badge_generation(config, success=False, error=error_msg, generation_time=generation_time)
             logger.error(f"Badge generation failed after {generation_time:.3f}s: {error_msg}")
-            raise
\ No newline at end of file
+            raise
+
+    async def render_variants(self, configs: List[Dict[str, Any]]) -> List[RenderedBadge]:
+        """
+        Render a set of related badge configurations (e.g. one title, many seeds)
+
+        Cache misses are split into at most one group per render worker, and each
+        group renders in a single job, so the variants in a group share that
+        worker's fonts, decoded logo, shape masks and text layout.
+
+        Args:
+            configs: Badge configuration dictionaries
+
+        Returns:
+            RenderedBadge per configuration, in order
+        """
+        start_time = time.time()
+
+        try:
+            logger.info(f"Starting generation of {len(configs)} badge variants")
+
+            prepared = [self._prepare(config) for config in configs]
+            encoded: List[Optional[EncodedImage]] = [
+                self.cache.get(key) if key else None for _, key in prepared
+            ]
+            misses = [i for i, e in enumerate(encoded) if e is None]
+
+            if misses:
+                groups = min(render_executor.workers, len(misses))
+                chunks = [misses[g::groups] for g in range(groups)]
+                results = await asyncio.gather(*(
+                    render_executor.render_images(
+                        [configs[i] for i in chunk], [prepared[i][0] for i in chunk])
+                    for chunk in chunks
+                ))
+                for chunk, images in zip(chunks, results):
+                    for i, image in zip(chunk, images):
+                        encode_stats.record(image)
+                        encoded[i] = image
+                        key = prepared[i][1]
+                        if key:
+                            self.cache.put(key, image, len(image.data))
+
+            generation_time = time.time() - start_time
+            logger.info(f"{len(configs)} badge variants generated in {generation_time:.3f}s "
+                        f"({len(configs) - len(misses)} from cache)")
+
+            missed = set(misses)
+            return [
+                RenderedBadge(image=e.data, config=config, media_type=e.media_type,
+                              cached=i not in missed)
+                for i, (config, e) in enumerate(zip(configs, encoded))
+            ]
+
+        except Exception as e:
+            generation_time = time.time() - start_time
+            logger.error(f"Badge variant generation failed after {generation_time:.3f}s: {str(e)}")
+            raise
+
+    async def generate_badge(self, config: Dict[str, Any]) -> BadgeResponse:
+        """
+        Generate a badge image from configuration
+
+        Args:
+            config: Badge configuration dictionary
+
+        Returns:
+            BadgeResponse with base64 encoded image
+        """
+        rendered = await self.render_badge(config, new_timings())
+        return rendered.to_response()
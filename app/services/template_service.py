@@ -0,0 +1,136 @@
+"""
+Badge template service - registers templates and renders them from base plates
+
+Registered templates are written to TEMPLATE_DIR as <id>.json, so every
+server worker can render a template registered through any other worker.
+Each worker keeps recently used templates in memory.
+"""
+
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+from app.core.encoder import EncodeOptions, encode_stats
+from app.core.logging_config import get_logger
+from app.core.render_executor import render_executor
+from app.core.templates import Template, render_template_image
+from app.core.utils.cache import LRUCache
+from app.core.utils.paths import resolve_asset_path
+from app.services.badge_service import RenderedBadge, apply_canvas_defaults
+from app.settings import settings
+
+logger = get_logger("template_service")
+
+TEMPLATE_ID = re.compile(r"[0-9a-f]{16}")
+
+
+class TemplateService:
+    """
+    File-backed template registry with an in-memory LRU in front
+
+    At most TEMPLATE_MAX_COUNT templates are kept, in memory and on disk; the
+    least recently used are dropped. An empty template_dir keeps templates in
+    memory only, which only works with a single server worker.
+    """
+
+    def __init__(self, template_dir: Optional[str] = None):
+        self.templates = LRUCache("templates", max_entries=settings.TEMPLATE_MAX_COUNT)
+        template_dir = settings.TEMPLATE_DIR if template_dir is None else template_dir
+        self.template_dir = resolve_asset_path(template_dir) if template_dir else None
+
+    def _path(self, template_id: str) -> str:
+        return os.path.join(self.template_dir, f"{template_id}.json")
+
+    def _save(self, template: Template):
+        """Write the template atomically, then drop the least recently used files past TEMPLATE_MAX_COUNT"""
+        os.makedirs(self.template_dir, exist_ok=True)
+        path = self._path(template.id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"spec": template.spec, "defaults": template.defaults}, f, sort_keys=True, default=str)
+        os.replace(tmp_path, path)
+
+        # Only files named like template ids are ever removed
+        stored = [name for name in os.listdir(self.template_dir)
+                  if name.endswith(".json") and TEMPLATE_ID.fullmatch(name[:-5])]
+        if len(stored) > settings.TEMPLATE_MAX_COUNT:
+            stored.sort(key=lambda name: os.path.getmtime(os.path.join(self.template_dir, name)))
+            for name in stored[:len(stored) - settings.TEMPLATE_MAX_COUNT]:
+                try:
+                    os.remove(os.path.join(self.template_dir, name))
+                except FileNotFoundError:
+                    pass  # another worker dropped it first
+
+    def _load(self, template_id: str) -> Optional[Template]:
+        """Template registered by any worker, or None"""
+        path = self._path(template_id)
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # The spec already has its canvas defaults, so this reproduces the registered template and id
+        template = Template.create(stored["spec"], stored["defaults"])
+        if template.id != template_id:
+            logger.warning(f"Ignoring template file {path}: its content hashes to {template.id}")
+            return None
+        return template
+
+    def register(self, config: Dict[str, Any], defaults: Optional[Dict[str, str]] = None) -> Template:
+        """
+        Register a badge configuration with {{placeholders}} as a template
+
+        Args:
+            config: Badge configuration dictionary (canvas and layers)
+            defaults: Values for placeholders a render request may leave out
+
+        Returns:
+            The registered Template
+
+        Raises:
+            ValueError: If the configuration or defaults are invalid
+        """
+        apply_canvas_defaults(config)
+        template = Template.create(config, defaults)
+        if self.template_dir:
+            self._save(template)
+        self.templates.put(template.id, template)
+        logger.info(f"Registered template {template.id} with placeholders {list(template.placeholders)}, "
+                    f"{len(template.plate_layers)} of {len(config['layers'])} layers in the base plate")
+        return template
+
+    def get(self, template_id: str) -> Optional[Template]:
+        template = self.templates.get(template_id)
+        if template is None and self.template_dir and TEMPLATE_ID.fullmatch(template_id):
+            template = self._load(template_id)
+            if template is not None:
+                self.templates.put(template_id, template)
+        return template
+
+    async def render(self, template: Template, values: Dict[str, str]) -> RenderedBadge:
+        """
+        Render a template with the given placeholder values
+
+        Args:
+            template: Registered template
+            values: Placeholder values
+
+        Returns:
+            RenderedBadge whose config is the resolved spec
+
+        Raises:
+            ValueError: If values are missing or unknown
+        """
+        start_time = time.time()
+        spec = template.resolve(values)
+        options = EncodeOptions.from_canvas(spec["canvas"])
+
+        encoded = await render_executor.run(
+            render_template_image, template.id, template.plate_layers, spec, options)
+        encode_stats.record(encoded)
+
+        logger.info(f"Template {template.id} rendered in {time.time() - start_time:.3f}s")
+        return RenderedBadge(image=encoded.data, config=spec, media_type=encoded.media_type)
@@ -0,0 +1,116 @@
+"""
+Warm-up service - renders representative badges before the service reports ready
+
+Fonts, assets and PIL's image plugins all load lazily, so without a warm-up
+the first requests after a deploy pay for them. The warm-up renders specs
+from the config generator covering every shape and fill mode, every font
+size step of the text badges, and every icon. It runs in the API process
+before the render workers are started, so forked workers inherit warm caches.
+Renders requested meanwhile wait for the warm pool (RenderExecutor.defer_start).
+"""
+
+import asyncio
+import os
+import random
+import time
+from itertools import count
+from typing import Any, Dict, Iterator
+
+from app.core.logging_config import get_logger
+from app.core.render_executor import render_badge_image
+from app.core.utils.cache import cache_stats
+from app.core.utils.paths import resolve_asset_path
+from app.services.badge_service import apply_canvas_defaults
+from app.services.config_generator import generate_badge_config, generate_badge_image_config
+from app.settings import settings
+
+logger = get_logger("warmup_service")
+
+SHAPES = ("hexagon", "circle", "rounded_rect")
+FILL_MODES = ("solid", "gradient")
+ICON_DIR = "assets/icons"
+
+# Title and subtitle lengths that hit each font size step of calculate_font_size
+TEXT_SAMPLES = (
+    {"badge_title": "Python Basics", "subtitle": "Data Analysis"},
+    {"badge_title": "Advanced Machine Learning", "subtitle": "Certified Achievement"},
+    {"badge_title": "Foundations of Cloud Infrastructure", "subtitle": "Professional Certificate in Data"},
+)
+MAX_SEEDS = 500  # seeds tried per text sample to find every shape/fill combination
+
+
+def warmup_specs() -> Iterator[Dict[str, Any]]:
+    """Generator configs covering every shape, fill mode, text size step and icon"""
+    for sample in TEXT_SAMPLES:
+        # Same text either way the generator picks between subtitle and extra text
+        meta = {**sample, "extra_text": sample["subtitle"]}
+        wanted = {(shape, fill) for shape in SHAPES for fill in FILL_MODES}
+        for seed in count():
+            if not wanted or seed >= MAX_SEEDS:
+                break
+            config = generate_badge_config(meta, seed=seed)
+            shape_layer = config["layers"][0]
+            combo = (shape_layer["shape"], shape_layer["fill"]["mode"])
+            if combo in wanted:
+                wanted.discard(combo)
+                yield config
+
+    icon_dir = resolve_asset_path(ICON_DIR)
+    for seed, name in enumerate(sorted(os.listdir(icon_dir)) if os.path.isdir(icon_dir) else []):
+        yield generate_badge_image_config({}, seed=seed, icon_dir=ICON_DIR, suggested_icon=name)
+
+
+class WarmupService:
+    def __init__(self):
+        self.done = False
+        self.renders = 0
+        self.failures = 0
+        self.seconds = 0.0
+
+    async def warm_up(self):
+        """
+        Render the warm-up specs in this process (once; later calls return immediately)
+
+        Renders run one at a time on a thread, so the event loop keeps
+        answering liveness checks while the caches fill. The thread shares this
+        process's caches, which forked render workers then inherit.
+        """
+        if self.done:
+            return
+        if not settings.WARMUP_ENABLED:
+            self.done = True
+            return
+
+        start = time.perf_counter()
+        evictions = {name: stats["evictions"] for name, stats in cache_stats().items()}
+        try:
+            for spec in warmup_specs():
+                try:
+                    await asyncio.to_thread(render_badge_image, spec, apply_canvas_defaults(spec))
+                    self.renders += 1
+                except Exception as e:
+                    self.failures += 1
+                    logger.warning(f"Warm-up render failed: {e}")
+        finally:
+            # The generator seeds the global RNG; don't leave unseeded requests predictable
+            random.seed()
+            self.seconds = time.perf_counter() - start
+            self.done = True
+        logger.info(f"Warm-up rendered {self.renders} badges in {self.seconds:.2f}s"
+                    + (f" ({self.failures} failed)" if self.failures else ""))
+        for name, stats in cache_stats().items():
+            evicted = stats["evictions"] - evictions.get(name, 0)
+            if evicted:
+                logger.warning(f"Cache '{name}' evicted {evicted} entries during warm-up; "
+                               f"its budget is smaller than the warm set")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "done": self.done,
+            "renders": self.renders,
+            "failures": self.failures,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+warmup_service = WarmupService()
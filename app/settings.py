@@ -2,7 +2,7 @@
 Application configuration using Pydantic Settings
 """
 
-from typing import List
+from typing import List, Literal
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -14,6 +14,13 @@ class Settings(BaseSettings):
     # Server settings
     PORT: int = 3001
 
+    # Pre-fork server settings (python -m app.server)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_WORKERS: int = 0  # 0 = one worker process per CPU core
+    SERVER_MAX_REQUESTS: int = 10000  # gracefully recycle a worker after this many requests (0 = never)
+    SERVER_MAX_REQUESTS_JITTER: int = 1000  # random extra requests so workers don't recycle together
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # seconds a stopping worker gets to finish in-flight requests
+
     # CORS settings
     CORS_ORIGINS_STR: str = "*"
 
@@ -21,6 +28,66 @@ class Settings(BaseSettings):
     CANVAS_WIDTH: int = 600
     CANVAS_HEIGHT: int = 600
 
+    # Output encoding defaults (a request's canvas options override these)
+    OUTPUT_FORMAT: Literal["png", "webp", "webp_lossy", "avif"] = "png"  # webp is lossless
+    PNG_COMPRESS_LEVEL: int = 6  # zlib level 0-9; lower is faster and larger
+    PNG_OPTIMIZE: bool = False
+    OUTPUT_QUALITY: int = 80  # webp_lossy / avif quality
+
+    # Render executor settings
+    RENDER_EXECUTOR: str = "process"  # process | thread
+    RENDER_WORKERS: int = 0  # 0 = one worker per CPU core
+    RENDER_MAX_QUEUE: int = 64  # renders allowed to wait for a free worker
+    RENDER_POOL_MAX_TASKS: int = 4000  # replace the whole process pool after this many renders in total (0 = never)
+
+    # Batch and variants endpoint settings
+    BATCH_MAX_ITEMS: int = 500
+    BATCH_CONCURRENCY: int = 0  # renders in flight per batch (0 = one per render worker)
+    VARIANTS_MAX_COUNT: int = 48  # variants per /badge/variants request
+
+    # Template settings
+    TEMPLATE_MAX_COUNT: int = 256  # registered templates kept (least recently used are dropped)
+    TEMPLATE_DIR: str = "data/templates"  # shared by all server workers; "" = in memory, single worker only
+    TEMPLATE_PLATE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # pre-rendered base plates per worker
+
+    # Compositing backend: "pillow" (Image.alpha_composite per layer) or
+    # "numpy" (one premultiplied array per render; requires numpy)
+    COMPOSITOR: Literal["pillow", "numpy"] = "pillow"
+    COMPOSITOR_ARRAY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # array views of cached masks/images
+
+    # Startup warm-up (representative renders before /api/v1/ready reports ready)
+    WARMUP_ENABLED: bool = True
+
+    # Asset cache settings
+    IMAGE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # decoded RGBA logos/icons and resized variants
+    FONT_CACHE_MAX_FACES: int = 64  # FreeType faces kept per (font, size)
+    FONT_PRELOAD_SIZES: List[int] = list(range(36, 46))  # sizes used by the config generator
+    SHAPE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # cropped shape fill/border masks and span tables
+    TEXT_LAYOUT_CACHE_MAX_ENTRIES: int = 4096  # laid-out text blocks per (text, font, size, width)
+    TEXT_ADVANCE_CACHE_MAX_ENTRIES: int = 65536  # word widths per (font, size, word)
+    GRADIENT_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # rendered gradient fills
+
+    # Normalized asset store written by `python -m app.assets build` (falls back to the originals)
+    ASSET_STORE_ENABLED: bool = True
+    ASSET_STORE_DIR: str = "assets/.store"
+
+    # Icon atlas (icons decoded and pre-scaled once at startup, shared by forked workers)
+    ICON_ATLAS_ENABLED: bool = True
+    ICON_ATLAS_DIR: str = "assets/icons"
+    ICON_ATLAS_SIZES: List[int] = [190]  # square boxes dynamic icon layers are fitted into
+
+    # Render cache settings (encoded images keyed by spec fingerprint)
+    RENDER_CACHE_ENABLED: bool = True
+    RENDER_CACHE_MAX_BYTES: int = 128 * 1024 * 1024
+    RENDER_CACHE_TTL_SECONDS: int = 3600
+
+    # Seeded request cache (generate-with-text/-icon responses keyed by request when a seed is given)
+    SEEDED_CACHE_ENABLED: bool = True
+    SEEDED_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Render timing (per-layer spans in a Server-Timing header and BadgeResponse.debug)
+    RENDER_TIMING_ENABLED: bool = False
+
     @property
     def CORS_ORIGINS(self) -> List[str]:
         """Parse CORS_ORIGINS from string"""
@@ -0,0 +1,107 @@
+"""
+Rendering benchmark suite
+
+Times render_from_spec per layer type, shape, fill mode and text length,
+PNG/WebP encoding, base64 and response serialization, the config generator,
+and the three badge endpoints end to end through an in-process ASGI client.
+Results are written as JSON with p50/p95/p99 latencies and allocations.
+
+Usage:
+    python -m benchmarks run [--output results.json] [--repeat 50] [--group render]
+    python -m benchmarks run --baseline baseline.json [--threshold 0.10]
+    python -m benchmarks compare baseline.json results.json [--threshold 0.10]
+
+compare (or run with --baseline) exits with status 1 if any benchmark is
+slower than the baseline by more than the threshold.
+"""
+
+import argparse
+import sys
+
+from benchmarks import harness, suite
+
+GROUPS = ("render", "encode", "config", "endpoint")
+
+
+def run(groups, repeat: int, match: str) -> dict:
+    from app.main import preload_assets
+
+    suite.disable_response_caches()
+    preload_assets()
+
+    cases = {}
+    if "render" in groups:
+        cases.update(suite.render_cases())
+    if "encode" in groups:
+        cases.update(suite.encode_cases())
+    if "config" in groups:
+        cases.update(suite.config_cases())
+    client = suite.EndpointClient() if "endpoint" in groups else None
+    if client:
+        cases.update(suite.endpoint_cases(client))
+
+    results = {}
+    try:
+        for name, fn in cases.items():
+            if match and match not in name:
+                continue
+            # End-to-end calls are slower and noisier; fewer of them keep a run short
+            result = harness.measure(fn, repeat if not name.startswith("endpoint.") else max(10, repeat // 2))
+            results[name] = result
+            print(f"{name:<40} p50 {result['p50_ms']:8.3f} ms  p95 {result['p95_ms']:8.3f} ms  "
+                  f"p99 {result['p99_ms']:8.3f} ms  peak {result['alloc_peak_bytes'] / 1024:8.1f} KiB",
+                  flush=True)
+    finally:
+        if client:
+            client.close()
+    return results
+
+
+def report(rows, metric: str, threshold: float) -> int:
+    regressions = [row for row in rows if row["regressed"]]
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else ""
+        print(f"{row['name']:<40} {row['baseline']:8.3f} -> {row['current']:8.3f} ms  "
+              f"{(row['ratio'] - 1) * 100:+6.1f}%  {flag}")
+    print(f"{len(regressions)} of {len(rows)} benchmarks regressed by more than "
+          f"{threshold * 100:.0f}% on {metric}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite")
+    run_parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    run_parser.add_argument("--repeat", type=int, default=50, help="timed calls per benchmark")
+    run_parser.add_argument("--group", action="append", choices=GROUPS, help="only these groups (repeatable)")
+    run_parser.add_argument("--match", default="", help="only benchmarks whose name contains this")
+    run_parser.add_argument("--baseline", help="results file to compare against after the run")
+
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown as a fraction")
+        sub.add_argument("--metric", default="p50_ms", help="result field to compare")
+        sub.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args.group or GROUPS, args.repeat, args.match)
+        harness.save(args.output, results)
+        print(f"Wrote {len(results)} results to {args.output}")
+        if not args.baseline:
+            return 0
+        baseline, current = harness.load(args.baseline), results
+    else:
+        baseline, current = harness.load(args.baseline), harness.load(args.current)
+
+    rows = harness.compare(baseline, current, args.metric, args.threshold, args.min_delta_ms)
+    return report(rows, args.metric, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Compare the Pillow and NumPy compositing backends
+
+Renders a fixed set of generated badge specs with each backend, checks that
+the outputs agree and reports the median render time.
+
+Usage:
+    python -m benchmarks.compositing [--repeat 20] [--tolerance 2]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from app.core.composer import compile_spec
+from app.services.config_generator import generate_icon_based_config, generate_text_overlay_config
+from app.settings import settings
+
+BACKENDS = ("pillow", "numpy")
+
+
+def badge_specs(count=12):
+    """Text overlay and icon badges across seeds, with the service's default background"""
+    specs = []
+    for seed in range(count):
+        specs.append(generate_text_overlay_config(
+            "Python Expert Advanced Data Science", "MIT", "Code with Confidence", seed=seed))
+        specs.append(generate_icon_based_config(["atom.png", "trophy.png", "brain.png"][seed % 3], seed=seed))
+    for spec in specs:
+        spec["layers"].insert(0, {"type": "BackgroundLayer", "mode": "solid", "color": "#FFFFFF00", "z": 0})
+    return specs
+
+
+def render_all(plans, backend):
+    settings.COMPOSITOR = backend
+    return [plan.render() for plan in plans]
+
+
+def max_difference(a, b):
+    """Largest per-channel difference of the visible (premultiplied) colour and of alpha"""
+    a = np.asarray(a).astype(np.int32)
+    b = np.asarray(b).astype(np.int32)
+    color = np.abs(a[..., :3] * a[..., 3:] - b[..., :3] * b[..., 3:]) / 255
+    return max(float(color.max()), float(np.abs(a[..., 3] - b[..., 3]).max()))
+
+
+def time_backends(plans, repeat):
+    """Median seconds per render for each backend, timed in alternating rounds"""
+    samples = {backend: [] for backend in BACKENDS}
+    for backend in BACKENDS:
+        render_all(plans, backend)  # warm the caches
+    for _ in range(repeat):
+        for backend in BACKENDS:
+            start = time.perf_counter()
+            render_all(plans, backend)
+            samples[backend].append((time.perf_counter() - start) / len(plans))
+    return {backend: statistics.median(times) for backend, times in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="timed rounds over the full spec set per backend")
+    parser.add_argument("--tolerance", type=float, default=2, help="allowed per-channel difference")
+    args = parser.parse_args()
+
+    original = settings.COMPOSITOR
+    plans = [compile_spec(json.loads(json.dumps(spec))) for spec in badge_specs()]
+    try:
+        reference, candidate = (render_all(plans, backend) for backend in BACKENDS)
+        worst = max(max_difference(a, b) for a, b in zip(reference, candidate))
+        print(f"{len(plans)} badges, max difference {worst:.1f} (tolerance {args.tolerance})")
+
+        timings = time_backends(plans, args.repeat)
+    finally:
+        settings.COMPOSITOR = original
+
+    for backend, seconds in timings.items():
+        print(f"{backend:>7}: {seconds * 1000:.2f} ms/render")
+    print(f"speedup: {timings['pillow'] / timings['numpy']:.2f}x")
+    return 0 if worst <= args.tolerance else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
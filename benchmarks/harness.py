@@ -0,0 +1,131 @@
+"""
+Timing, allocation and baseline comparison helpers for the benchmark suite
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import PIL
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentiles(samples: List[float]) -> Dict[int, float]:
+    if len(samples) < 2:
+        return {p: samples[0] for p in PERCENTILES}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {p: cuts[p - 1] for p in PERCENTILES}
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 3, alloc_samples: int = 5) -> Dict[str, Any]:
+    """
+    Time fn and sample its memory allocations
+
+    Timing and allocation tracing run in separate passes, so tracemalloc's
+    overhead doesn't show up in the timings. Allocations are Python-level
+    (tracemalloc): pixel buffers Pillow allocates in C are not included.
+
+    Args:
+        fn: Zero-argument callable to benchmark
+        repeat: Timed calls
+        warmup: Untimed calls first, to fill caches
+        alloc_samples: Calls traced for allocations
+
+    Returns:
+        Result dict with latency percentiles (ms) and median allocations per call
+    """
+    for _ in range(warmup):
+        fn()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+
+    peaks, blocks = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_samples):
+            tracemalloc.reset_peak()
+            current_before = tracemalloc.get_traced_memory()[0]
+            blocks_before = sys.getallocatedblocks()
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current_before)
+            blocks.append(sys.getallocatedblocks() - blocks_before)
+    finally:
+        tracemalloc.stop()
+
+    pct = percentiles(times)
+    return {
+        "n": len(times),
+        "mean_ms": round(statistics.fmean(times), 4),
+        **{f"p{p}_ms": round(v, 4) for p, v in pct.items()},
+        "min_ms": round(min(times), 4),
+        "max_ms": round(max(times), 4),
+        "alloc_peak_bytes": int(statistics.median(peaks)) if peaks else 0,
+        "alloc_retained_blocks": int(statistics.median(blocks)) if blocks else 0,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """What the numbers were measured on, stored with every result file"""
+    from app.settings import settings
+
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "numpy": numpy_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "compositor": settings.COMPOSITOR,
+        "render_executor": settings.RENDER_EXECUTOR,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def save(path: str, results: Dict[str, Dict[str, Any]]):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]],
+            metric: str = "p50_ms", threshold: float = 0.10, min_delta_ms: float = 0.05) -> List[Dict[str, Any]]:
+    """
+    Compare two result sets on one metric
+
+    A benchmark regresses when it is more than threshold (a fraction) slower
+    than the baseline and by at least min_delta_ms, so sub-noise changes in
+    very fast benchmarks don't fail the comparison.
+
+    Returns:
+        One row per benchmark present in both sets
+    """
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name][metric], current[name][metric]
+        ratio = after / before if before else float("inf")
+        rows.append({
+            "name": name,
+            "baseline": before,
+            "current": after,
+            "ratio": ratio,
+            "regressed": ratio > 1 + threshold and after - before >= min_delta_ms,
+        })
+    return rows
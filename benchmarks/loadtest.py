@@ -0,0 +1,425 @@
+"""
+Load-test harness
+
+Replays a JSONL corpus of requests against a running API and reports
+throughput, latency percentiles, error rates and the server-reported time,
+to find the saturation point per worker count.
+
+Usage:
+    python -m benchmarks.loadtest --corpus requests.jsonl --concurrency 8 --duration 30
+    python -m benchmarks.loadtest --corpus traffic.jsonl --rate 20,40,80 --mix text=6,icon=3,custom=1
+    python -m benchmarks.loadtest --start-server --workers 1,2,4 --rate 10,20,40,80
+
+Corpus lines may be:
+    {"endpoint": "generate-with-text", "body": {...}}   captured traffic
+    {"short_title": ..., "achievement_phrase": ...}     a generate-with-text body
+    {"icon_name": ...}                                  a generate-with-icon body
+    {"layers": [...]}                                   a generate (custom spec) body
+    {"title": ...}                                      any other record with a title, e.g. requests.jsonl,
+                                                        replayed as a text badge titled with it
+
+Endpoints in the mix the corpus has no requests for get synthesized ones:
+icon badges cycle through assets/icons, custom specs come from the config
+generator using the corpus titles.
+
+--concurrency runs a closed loop: N clients, each sending its next request
+when the previous one returns. --rate runs an open loop: Poisson arrivals at
+R requests/s regardless of how fast the server answers, with latency counted
+from each request's scheduled start, so a saturated server shows up as
+growing latency instead of a slower client. Every listed rate (or
+concurrency) is run in turn.
+
+--start-server launches python -m app.server on a free local port once per
+--workers value, with RENDER_TIMING_ENABLED=true, waits for /ready and stops
+it after its runs. Against a server started some other way, render time is
+only reported if that server has render timing enabled.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.settings import settings
+from benchmarks.harness import percentiles
+
+ENDPOINTS = {
+    "text": "/badge/generate-with-text",
+    "icon": "/badge/generate-with-icon",
+    "custom": "/badge/generate",
+}
+DEFAULT_MIX = {"text": 6, "icon": 3, "custom": 1}
+ICON_DIR = "assets/icons"
+MAX_TITLE = 40
+# A run saturated the server when it served less than this share of the offered rate, or errored more
+SATURATED_THROUGHPUT = 0.95
+SATURATED_ERROR_RATE = 0.01
+
+
+@dataclass
+class Request:
+    kind: str
+    body: Dict[str, Any]
+
+
+@dataclass
+class Result:
+    latency_ms: float
+    status: int  # 0 for transport errors, -1 for requests dropped at --max-in-flight
+    server_ms: Optional[float] = None
+    render_ms: Optional[float] = None
+
+
+def _kind_of(endpoint: str) -> Optional[str]:
+    for kind, path in ENDPOINTS.items():
+        if endpoint in (kind, path, path.rsplit("/", 1)[-1]) or endpoint.endswith(path):
+            return kind
+    return None
+
+
+def parse_record(record: Dict[str, Any]) -> Optional[Request]:
+    """Map one corpus line to a request, or None if it can't be replayed"""
+    if "endpoint" in record and isinstance(record.get("body"), dict):
+        kind = _kind_of(str(record["endpoint"]))
+        return Request(kind, record["body"]) if kind else None
+    if "layers" in record:
+        return Request("custom", record)
+    if "icon_name" in record:
+        return Request("icon", record)
+    if "short_title" in record:
+        return Request("text", record)
+    title = record.get("title") or record.get("badge_title")
+    if title:
+        phrase = str(record.get("body") or record.get("subtitle") or title)
+        return Request("text", {"short_title": str(title)[:MAX_TITLE],
+                                "achievement_phrase": phrase.split(". ")[0][:MAX_TITLE]})
+    return None
+
+
+def load_corpus(path: str) -> Dict[str, List[Request]]:
+    corpus: Dict[str, List[Request]] = {kind: [] for kind in ENDPOINTS}
+    skipped = 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                request = parse_record(json.loads(line))
+            except json.JSONDecodeError:
+                request = None
+            if request is None:
+                skipped += 1
+            else:
+                corpus[request.kind].append(request)
+    if skipped:
+        print(f"Skipped {skipped} corpus lines that aren't replayable requests", file=sys.stderr)
+    return corpus
+
+
+def synthesize(corpus: Dict[str, List[Request]], mix: Dict[str, float]):
+    """Fill endpoints in the mix that the corpus has no requests for"""
+    from app.core.utils.paths import resolve_asset_path
+    from app.services.config_generator import generate_text_overlay_config
+
+    titles = [r.body for r in corpus["text"]] or [{"short_title": "Python Basics", "achievement_phrase": "Well Done"}]
+    if mix.get("icon") and not corpus["icon"]:
+        icons = sorted(os.listdir(resolve_asset_path(ICON_DIR)))
+        corpus["icon"] = [Request("icon", {"icon_name": name}) for name in icons]
+    if mix.get("custom") and not corpus["custom"]:
+        corpus["custom"] = [
+            Request("custom", generate_text_overlay_config(t["short_title"], t.get("institute") or "",
+                                                           t["achievement_phrase"], seed=seed))
+            for seed, t in enumerate(titles[:50])
+        ]
+    if mix.get("text") and not corpus["text"]:
+        corpus["text"] = [Request("text", t) for t in titles]
+
+
+def request_stream(corpus: Dict[str, List[Request]], mix: Dict[str, float], seed: int) -> Iterator[Request]:
+    """Endless requests: the endpoint is drawn by mix weight, then each endpoint's corpus replays in order"""
+    kinds = [kind for kind, weight in mix.items() if weight > 0 and corpus.get(kind)]
+    if not kinds:
+        raise SystemExit("Nothing to replay: the corpus and mix have no endpoint in common")
+    weights = [mix[kind] for kind in kinds]
+    cycles = {kind: itertools.cycle(corpus[kind]) for kind in kinds}
+    rng = random.Random(seed)
+    while True:
+        yield next(cycles[rng.choices(kinds, weights)[0]])
+
+
+def _server_times(headers) -> Tuple[Optional[float], Optional[float]]:
+    """Total processing time (X-Process-Time) and render time (Server-Timing "render"), in ms"""
+    server_ms = render_ms = None
+    if "x-process-time" in headers:
+        try:
+            server_ms = float(headers["x-process-time"]) * 1000
+        except ValueError:
+            pass
+    for metric in headers.get("server-timing", "").split(","):
+        name, _, params = metric.strip().partition(";")
+        if name != "render":
+            continue
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                try:
+                    render_ms = float(value)
+                except ValueError:
+                    pass
+    return server_ms, render_ms
+
+
+async def _send(client, request: Request, start: float) -> Result:
+    try:
+        response = await client.post(f"{settings.API_V1_STR}{ENDPOINTS[request.kind]}", json=request.body)
+    except Exception:
+        return Result((time.perf_counter() - start) * 1000, 0)
+    latency_ms = (time.perf_counter() - start) * 1000
+    return Result(latency_ms, response.status_code, *_server_times(response.headers))
+
+
+async def closed_loop(client, requests: Iterator[Request], concurrency: int, duration: float,
+                      limit: Optional[int]) -> Tuple[List[Result], float]:
+    results: List[Result] = []
+    sent = itertools.count()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def user():
+        while time.perf_counter() < deadline and (limit is None or next(sent) < limit):
+            results.append(await _send(client, next(requests), time.perf_counter()))
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+async def open_loop(client, requests: Iterator[Request], rate: float, duration: float,
+                    limit: Optional[int], max_in_flight: int, seed: int) -> Tuple[List[Result], float, float]:
+    """
+    Send Poisson arrivals at rate per second
+
+    Returns:
+        Results, seconds until the last response, and the rate actually
+        offered (arrivals over the arrival window), which varies around rate
+    """
+    results: List[Result] = []
+    in_flight = set()
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    scheduled = start
+    sent = 0
+    last_arrival = start
+
+    async def send(request: Request, at: float):
+        results.append(await _send(client, request, at))
+
+    while scheduled - start < duration and (limit is None or sent < limit):
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            results.append(Result(0.0, -1))
+        else:
+            task = asyncio.create_task(send(next(requests), scheduled))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        sent += 1
+        last_arrival = scheduled
+        scheduled += rng.expovariate(rate)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    window = last_arrival - start
+    return results, time.perf_counter() - start, (sent - 1) / window if window > 0 else float(sent)
+
+
+def summarize(results: List[Result], elapsed: float, offered: Optional[float] = None) -> Dict[str, Any]:
+    ok = [r for r in results if 200 <= r.status < 300]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if not 200 <= r.status < 300:
+            key = {0: "transport", -1: "dropped"}.get(r.status, str(r.status))
+            errors[key] = errors.get(key, 0) + 1
+    summary: Dict[str, Any] = {
+        "requests": len(results),
+        "ok": len(ok),
+        "seconds": round(elapsed, 3),
+        "offered_rps": round(offered, 2) if offered is not None else None,
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "errors": errors,
+    }
+    for field, prefix in (("latency_ms", ""), ("server_ms", "server_"), ("render_ms", "render_")):
+        samples = [getattr(r, field) for r in ok if getattr(r, field) is not None]
+        if samples:
+            summary[f"{prefix}mean_ms"] = round(statistics.fmean(samples), 2)
+            summary.update({f"{prefix}p{p}_ms": round(v, 2) for p, v in percentiles(samples).items()})
+    return summary
+
+
+def _saturated(summary: Dict[str, Any]) -> bool:
+    if summary["error_rate"] > SATURATED_ERROR_RATE:
+        return True
+    offered = summary["offered_rps"]
+    return offered is not None and summary["throughput_rps"] < offered * SATURATED_THROUGHPUT
+
+
+def _print_row(label: str, summary: Dict[str, Any], saturated: bool):
+    server = f"  server p50 {summary['server_p50_ms']:8.1f}" if "server_p50_ms" in summary else ""
+    render = f"  render p50 {summary['render_p50_ms']:8.1f}" if "render_p50_ms" in summary else ""
+    latency = (f"p50 {summary['p50_ms']:8.1f}  p95 {summary['p95_ms']:8.1f}  p99 {summary['p99_ms']:8.1f} ms"
+               if "p50_ms" in summary else "no successful requests")
+    offered = f" (offered {summary['offered_rps']:6.1f})" if summary["offered_rps"] is not None else ""
+    print(f"{label:<16} {summary['throughput_rps']:8.1f} req/s{offered}  {latency}  "
+          f"errors {summary['error_rate'] * 100:5.1f}%{server}{render}"
+          + ("  SATURATED" if saturated else ""), flush=True)
+
+
+async def _run_levels(url: str, corpus, args) -> List[Dict[str, Any]]:
+    import httpx
+
+    open_loop_mode = bool(args.rate)
+    levels = args.rate or args.concurrency
+    connections = args.max_in_flight if open_loop_mode else max(levels)
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    rows = []
+    warned = False
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        for level in levels:
+            requests = request_stream(corpus, args.mix, args.seed)
+            if open_loop_mode:
+                results, elapsed, offered = await open_loop(client, requests, level, args.duration,
+                                                            args.requests, args.max_in_flight, args.seed)
+                label = f"rate {level:g}/s"
+            else:
+                results, elapsed = await closed_loop(client, requests, int(level), args.duration, args.requests)
+                label, offered = f"concurrency {int(level)}", None
+            summary = summarize(results, elapsed, offered)
+            saturated = _saturated(summary)
+            _print_row(label, summary, saturated)
+            if summary["ok"] and "render_p50_ms" not in summary and not warned:
+                print(f"Warning: no response from {url} had a Server-Timing render entry, so render time isn't "
+                      f"reported; run the server with RENDER_TIMING_ENABLED=true", file=sys.stderr, flush=True)
+                warned = True
+            rows.append({"mode": "open" if open_loop_mode else "closed", "level": level,
+                         "saturated": saturated, **summary})
+    return rows
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, timeout: float) -> Tuple[subprocess.Popen, str]:
+    """Start python -m app.server with the given worker count and wait until /ready answers 200"""
+    import httpx
+
+    port = _free_port()
+    # Render timing on, so responses report render time in Server-Timing
+    env = {**os.environ, "SERVER_HOST": "127.0.0.1", "PORT": str(port), "SERVER_WORKERS": str(workers),
+           "RENDER_TIMING_ENABLED": "true"}
+    process = subprocess.Popen([sys.executable, "-m", "app.server"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with status {process.returncode} during startup")
+        try:
+            if httpx.get(f"{url}{settings.API_V1_STR}/ready", timeout=2).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise SystemExit(f"Server with {workers} workers wasn't ready after {timeout:.0f}s")
+
+
+def stop_server(process: subprocess.Popen):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=settings.SERVER_GRACEFUL_TIMEOUT + 10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _numbers(value: str) -> List[float]:
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def _mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{kind}', expected one of {', '.join(ENDPOINTS)}")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="JSONL requests to replay (default: synthesized requests only)")
+    parser.add_argument("--mix", type=_mix, default=DEFAULT_MIX, help="endpoint weights, e.g. text=6,icon=3,custom=1")
+    parser.add_argument("--concurrency", type=_numbers, default=[8], help="closed loop clients, comma-separated")
+    parser.add_argument("--rate", type=_numbers, help="open loop arrivals per second, comma-separated")
+    parser.add_argument("--max-in-flight", type=int, default=512,
+                        help="open loop: drop arrivals beyond this many outstanding requests")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per run")
+    parser.add_argument("--requests", type=int, help="stop a run after this many requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the endpoint mix and arrival times")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{settings.PORT}", help="API to load")
+    parser.add_argument("--start-server", action="store_true", help="start python -m app.server per worker count")
+    parser.add_argument("--workers", type=lambda v: [int(n) for n in _numbers(v)], default=[1],
+                        help="with --start-server: worker counts to sweep, comma-separated")
+    parser.add_argument("--startup-timeout", type=float, default=120.0, help="seconds to wait for /ready")
+    parser.add_argument("--output", help="write every run's summary to this JSON file")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else {kind: [] for kind in ENDPOINTS}
+    synthesize(corpus, args.mix)
+    print(f"Replaying {', '.join(f'{len(corpus[k])} {k}' for k in ENDPOINTS if args.mix.get(k))} requests, "
+          f"mix {', '.join(f'{k}={w:g}' for k, w in args.mix.items())}")
+
+    runs = []
+    for workers in (args.workers if args.start_server else [None]):
+        process, url = start_server(workers, args.startup_timeout) if workers else (None, args.url)
+        if workers:
+            print(f"-- {workers} server workers")
+        try:
+            rows = asyncio.run(_run_levels(url, corpus, args))
+        finally:
+            if process:
+                stop_server(process)
+        runs.extend({"workers": workers, **row} for row in rows)
+
+    # The highest level each worker count sustained before it saturated
+    for workers, rows in itertools.groupby(runs, key=lambda row: row["workers"]):
+        sustained = [row for row in rows if not row["saturated"]]
+        best = max(sustained, key=lambda row: row["throughput_rps"]) if sustained else None
+        prefix = f"{workers} workers: " if workers else ""
+        print(f"{prefix}peak sustained {best['throughput_rps']:.1f} req/s at {best['mode']} level {best['level']:g}"
+              if best else f"{prefix}saturated at every level")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"corpus": args.corpus, "mix": args.mix, "runs": runs}, f, indent=2)
+        print(f"Wrote {len(runs)} runs to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Benchmark cases
+
+Each case is a zero-argument callable. Cases with fixed inputs render the
+same spec every call (steady state, warm caches). Cases that take a seed use
+a counter, so a run always walks the same sequence of generated configs.
+The render and response caches are turned off, so endpoint timings include
+rendering.
+"""
+
+import asyncio
+import copy
+from itertools import count
+from typing import Callable, Dict, Iterator, Tuple
+
+from app.core.composer import render_from_spec
+from app.core.encoder import EncodeOptions, encode_image
+from app.core.utils.shapes import SHAPES
+from app.services.badge_service import RenderedBadge
+from app.services.config_generator import (generate_badge_config, generate_badge_image_config,
+                                           generate_text_overlay_config)
+from app.settings import settings
+
+CANVAS = {"width": 600, "height": 600}
+BACKGROUND = {"type": "BackgroundLayer", "mode": "solid", "color": "#FFFFFF00", "z": 0}
+FILLS = {
+    "solid": {"mode": "solid", "color": "#118AB2"},
+    "gradient": {"mode": "gradient", "start_color": "#FF6F61", "end_color": "#26547C", "vertical": True},
+}
+SHAPE_PARAMS = {"rounded_rect": {"radius": 40, "width": 450, "height": 450}}
+TEXTS = {
+    "short": "Python Basics",
+    "medium": "Advanced Machine Learning with Python",
+    "long": "Foundations of Cloud Infrastructure, Networking and Site Reliability Engineering",
+}
+TEXT_META = {"badge_title": "Advanced Machine Learning", "subtitle": "Certified Achievement"}
+
+Case = Callable[[], object]
+
+
+def _spec(*layers) -> Dict:
+    return {"canvas": dict(CANVAS), "layers": [dict(BACKGROUND), *layers]}
+
+
+def _shape(shape: str, fill: str) -> Dict:
+    return {"type": "ShapeLayer", "shape": shape, "fill": FILLS[fill],
+            "border": {"color": "#222222", "width": 4}, "params": SHAPE_PARAMS.get(shape, {"radius": 250}), "z": 10}
+
+
+def _text(text: str) -> Dict:
+    return {"type": "TextLayer", "text": text, "font": {"path": "assets/fonts/ArialBold.ttf", "size": 40},
+            "color": "#000000", "align": {"x": "center", "y": "center"},
+            "wrap": {"max_width": 420, "line_gap": 6}, "z": 30}
+
+
+def render_specs() -> Iterator[Tuple[str, Dict]]:
+    """Specs isolating one layer type, shape, fill mode or text length, plus full generator badges"""
+    yield "render.layer.background", _spec()
+    for shape in SHAPES:
+        for fill in FILLS:
+            yield f"render.shape.{shape}.{fill}", _spec(_shape(shape, fill))
+    yield "render.layer.logo", _spec({"type": "LogoLayer", "path": "assets/logos/wgu_logo.png",
+                                      "size": {"dynamic": True}, "position": {"x": "center", "y": "top"}, "z": 20})
+    yield "render.layer.icon", _spec({"type": "ImageLayer", "path": "assets/icons/trophy.png",
+                                      "size": {"dynamic": True}, "position": {"x": "center", "y": "center"}, "z": 20})
+    yield "render.layer.image", _spec({"type": "ImageLayer", "path": "assets/image-layers/ribbon2.png",
+                                       "size": {"width": 300}, "position": {"x": "center", "y": "bottom"}, "z": 20})
+    for length, text in TEXTS.items():
+        yield f"render.text.{length}", _spec(_text(text))
+
+    text_badge = generate_text_overlay_config("Python Expert Advanced Data Science", "MIT", "Code with Confidence", seed=1)
+    icon_badge = generate_badge_image_config({}, seed=1, suggested_icon="trophy.png")
+    yield "render.badge.text", _spec(*text_badge["layers"])
+    yield "render.badge.icon", _spec(*icon_badge["layers"])
+
+
+def render_cases() -> Dict[str, Case]:
+    return {name: (lambda spec=spec: render_from_spec(spec)) for name, spec in render_specs()}
+
+
+def encode_cases() -> Dict[str, Case]:
+    """PNG/WebP encoding and the response serialization steps, on one rendered badge"""
+    spec = dict(render_specs())["render.badge.text"]
+    image = render_from_spec(spec)
+    png = encode_image(image, EncodeOptions())
+    rendered = RenderedBadge(image=png.data, config=spec)
+    return {
+        "encode.png": lambda: encode_image(image, EncodeOptions(format="png")),
+        "encode.webp": lambda: encode_image(image, EncodeOptions(format="webp")),
+        "serialize.base64": rendered.data_uri,
+        "serialize.response_json": lambda: rendered.to_response().model_dump_json(),
+    }
+
+
+def config_cases() -> Dict[str, Case]:
+    seeds = count()
+    return {
+        "config.generate_badge_config": lambda: generate_badge_config(TEXT_META, seed=next(seeds)),
+        "config.generate_badge_image_config": lambda: generate_badge_image_config(
+            {}, seed=next(seeds), suggested_icon="trophy.png"),
+    }
+
+
+class EndpointClient:
+    """In-process ASGI client for the app, driven from a private event loop"""
+
+    def __init__(self):
+        import httpx
+
+        from app.main import app
+
+        self.loop = asyncio.new_event_loop()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    def post(self, path: str, body: Dict):
+        response = self.loop.run_until_complete(self.client.post(f"{settings.API_V1_STR}{path}", json=body))
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    def close(self):
+        from app.core.render_executor import render_executor
+
+        self.loop.run_until_complete(self.client.aclose())
+        self.loop.close()
+        render_executor.shutdown()
+
+
+def endpoint_cases(client: EndpointClient) -> Dict[str, Case]:
+    seeds = count()
+    custom = dict(render_specs())["render.badge.text"]
+    return {
+        "endpoint.generate": lambda: client.post("/badge/generate", copy.deepcopy(custom)),
+        "endpoint.generate_with_text": lambda: client.post("/badge/generate-with-text", {
+            "short_title": "Python Expert Advanced Data Science", "institute": "MIT",
+            "achievement_phrase": "Code with Confidence", "seed": next(seeds)}),
+        "endpoint.generate_with_icon": lambda: client.post("/badge/generate-with-icon", {
+            "icon_name": "trophy.png", "seed": next(seeds)}),
+    }
+
+
+def disable_response_caches():
+    """Every call should render; cache hits would measure a dictionary lookup"""
+    settings.RENDER_CACHE_ENABLED = False
+    settings.SEEDED_CACHE_ENABLED = False
@@ -0,0 +1,29 @@
+import asyncio
+import os
+
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+
+from app.controllers import health
+from app.core.render_executor import RenderExecutor
+
+
+def _crash():
+    os._exit(1)
+
+
+def test_ready_after_render_pool_breaks(monkeypatch):
+    executor = RenderExecutor(kind="process", workers=1)
+    monkeypatch.setattr(health, "render_executor", executor)
+    monkeypatch.setattr(health.warmup_service, "done", True)
+    executor.start()
+    try:
+        with pytest.raises(BrokenProcessPool):
+            asyncio.run(executor.run(_crash))
+
+        # The pool is recreated by the next render; readiness must not depend on one arriving
+        ready = asyncio.run(health.readiness_check())
+        assert ready["status"] == "ready"
+        assert asyncio.run(executor.run(os.getpid)) != os.getpid()
+    finally:
+        executor.shutdown()